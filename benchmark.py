@@ -0,0 +1,153 @@
+# benchmark.py
+"""
+Headless frame-time benchmark. Runs each scene for N frames on the SDL
+dummy driver with a scripted MIDI stream, without throttling:
+
+    python benchmark.py
+    python benchmark.py --frames 3000 --scene RHYTHM_TRAINER --chart song.mid --midi song.mid
+    python benchmark.py --scene RHYTHM_TRAINER --players 4   # split-screen, one input per player
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+import config
+from core import headless, timing
+from core.scene_manager import SceneManager
+
+SCENES = ['MENU', 'NOTE_TRAINER', 'RHYTHM_TRAINER', 'CHORD_TRAINER', 'PLAY_ALONG']
+STAGES = ['handle_input', 'process_midi', 'update', 'draw']
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(values, scale=1000.0):
+    """p50 / p95 / p99 / max, scaled (default: seconds -> ms)."""
+    values = sorted(v * scale for v in values)
+    return [percentile(values, 50), percentile(values, 95), percentile(values, 99),
+            values[-1] if values else 0.0]
+
+def make_midi_source(args):
+    if args.midi:
+        performances = [headless.load_performance(args.midi, args.midi_delay)] * args.players
+    else:
+        duration = args.frames / args.fps
+        note_range = config.USER_KEYBOARD_CONFIG['range']
+        performances = [headless.generate_performance(duration, args.notes_per_second, note_range,
+                                                      seed=args.seed + seat)
+                        for seat in range(args.players)]
+    if args.players == 1:
+        return headless.ScriptedMidiSource(performances[0])
+    # Split-screen: each player plays on their own (fake) port
+    return headless.ScriptedMidiSource([(t, msg, f"Keyboard {seat + 1}")
+                                        for seat, timed in enumerate(performances)
+                                        for t, msg in timed])
+
+def run_pass(scene_name, screen, args, on_frame):
+    """Fresh SceneManager -> warm up -> run args.frames frames with on_frame."""
+    manager = SceneManager()
+    manager.players.set_count(args.players)
+    runner = headless.HeadlessRunner(manager, screen, frame_dt=1 / args.fps)
+    manager.switch_to(scene_name)
+    runner.run(args.warmup)
+    source = make_midi_source(args)
+    source.start_time = timing.now()
+    runner.run(args.frames, source, on_frame)
+    runner.close()
+
+def bench_scene(scene_name, screen, args):
+    result = {
+        'stages': {stage: [] for stage in STAGES},
+        'frame': [],
+        'latency': [],       # MIDI arrival -> judged, seconds
+        'alloc_bytes': [],   # Peak bytes allocated during each frame
+        'alloc_blocks': [],  # Net allocated blocks per frame
+    }
+
+    # 1. Timing pass (no tracing overhead)
+    def on_timed_frame(frame, scene, midi_events, stage_times):
+        for stage in STAGES:
+            result['stages'][stage].append(stage_times[stage])
+        result['frame'].append(sum(stage_times.values()))
+        # Events wait in the queue until the frame starts (virtual time),
+        # then take process_midi's real time to be judged.
+        frame_start = timing.now()
+        for event in midi_events:
+            result['latency'].append(frame_start - event.timestamp + stage_times['process_midi'])
+
+    run_pass(scene_name, screen, args, on_timed_frame)
+
+    # 2. Allocation pass (same script, with tracemalloc on)
+    last = {}
+    def on_traced_frame(frame, scene, midi_events, stage_times):
+        current, peak = tracemalloc.get_traced_memory()
+        result['alloc_bytes'].append(max(0, peak - last['mem']))
+        last['mem'] = current
+        tracemalloc.reset_peak()
+        blocks = sys.getallocatedblocks()
+        result['alloc_blocks'].append(blocks - last['blocks'])
+        last['blocks'] = blocks
+
+    tracemalloc.start()
+    last['mem'] = tracemalloc.get_traced_memory()[0]
+    last['blocks'] = sys.getallocatedblocks()
+    run_pass(scene_name, screen, args, on_traced_frame)
+    tracemalloc.stop()
+    return result
+
+def print_report(scene_name, result, args):
+    players = f", {args.players} players" if args.players > 1 else ""
+    print(f"\n== {scene_name} ({args.frames} frames @ {args.fps} virtual FPS{players})")
+    print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = [(stage, result['stages'][stage]) for stage in STAGES]
+    rows.append(('frame total', result['frame']))
+    for label, values in rows:
+        p50, p95, p99, worst = summarize(values)
+        print(f"{label:<16}{p50:>10.3f}{p95:>10.3f}{p99:>10.3f}{worst:>10.3f}")
+
+    if result['latency']:
+        p50, p95, p99, worst = summarize(result['latency'])
+        print(f"{'input->judged':<16}{p50:>10.3f}{p95:>10.3f}{p99:>10.3f}{worst:>10.3f}"
+              f"   ({len(result['latency'])} events)")
+
+    frames = len(result['alloc_bytes']) or 1
+    print(f"alloc/frame: {sum(result['alloc_bytes']) / frames / 1024:.1f} KiB peak, "
+          f"{sum(result['alloc_blocks']) / frames:+.2f} net blocks")
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenKeys headless frame-time benchmark")
+    parser.add_argument('--scene', choices=SCENES, action='append',
+                        help="Scene to run (repeatable, default: all)")
+    parser.add_argument('--frames', type=int, default=1200)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--fps', type=float, default=60, help="Virtual frame rate")
+    parser.add_argument('--keys', type=int, choices=[49, 61, 88], default=61)
+    parser.add_argument('--chart', help="Rhythm Trainer chart (.mid)")
+    parser.add_argument('--midi', help="Replay this .mid file as the player's input")
+    parser.add_argument('--midi-delay', type=float, default=0.0,
+                        help="Seconds to shift --midi input by")
+    parser.add_argument('--notes-per-second', type=float, default=4.0,
+                        help="Density of the generated input (when no --midi)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--players', type=int, choices=[1, 2, 4], default=1,
+                        help="Split-screen players, each with their own generated input")
+    args = parser.parse_args()
+
+    ranges = {49: (48, 84), 61: (36, 96), 88: (21, 108)}
+    config.USER_KEYBOARD_CONFIG = {'label': f"{args.keys} Keys", 'keys': args.keys,
+                                   'range': ranges[args.keys]}
+    config.RHYTHM_CHART_PATH = args.chart
+    # No synth here: Play Along still schedules every event, to nowhere
+    config.PLAYBACK_OUTPUT = "null"
+
+    screen = headless.init_headless_display()
+    started = time.perf_counter()
+    for scene_name in args.scene or SCENES:
+        print_report(scene_name, bench_scene(scene_name, screen, args), args)
+    print(f"\nTotal wall time: {time.perf_counter() - started:.1f} s")
+
+if __name__ == "__main__":
+    main()
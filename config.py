@@ -1,10 +1,18 @@
 # config.py
+import os
 import pygame
 
 # Screen Settings
+# Initial window size. The window is resizable and scenes lay themselves
+# out relative to its current size (core/layout.py).
 SCREEN_WIDTH = 1024
 SCREEN_HEIGHT = 768
-FPS = 60
+FULLSCREEN = False  # Start fullscreen (F11 toggles)
+# Draw at this fixed size and let the GPU scale it to the window, e.g.
+# (640, 480) on weak hardware. None = draw at the window's own resolution.
+RENDER_RESOLUTION = None
+FPS = 60        # Frame cap; 0 = uncapped (gameplay is clock-driven, not frame-driven)
+VSYNC = False   # Let the display's refresh rate pace the loop (implies GPU scaling)
 
 # Colors
 COLOR_BG = (30, 30, 30)
@@ -17,6 +25,82 @@ COLOR_FAIL = (200, 50, 50)
 # This will be updated by the Menu Scene
 # Format: {'keys': 61, 'range': (36, 96)}
 USER_KEYBOARD_CONFIG = None 
+# Used when no keyboard has been selected yet (debugging)
+DEFAULT_KEYBOARD_RANGE = (36, 96)
 
 # Initial MIDI setup
-MIDI_DEVICE_NAME = None
\ No newline at end of file
+MIDI_DEVICE_NAME = None            # Only open ports whose name contains this (None = all)
+MIDI_IGNORE_PORTS = ("Midi Through",)
+MIDI_SCAN_INTERVAL = 1.0           # Seconds between hot-plug checks of the port list
+
+# Max number of timestamped MIDI events buffered between frames
+MIDI_QUEUE_SIZE = 1024
+
+# Memory cap for cached text surfaces (core/text_cache.py)
+TEXT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Split-screen group lessons: students playing at once, each on their own
+# MIDI keyboard (1, 2 or 4; P in the main menu changes it). The Note and
+# Rhythm trainers give every player their own part of the screen.
+PLAYERS = 1
+
+# Rhythm Trainer: play this .mid file instead of random notes (None = random).
+# Also the piece Play Along plays.
+RHYTHM_CHART_PATH = None
+
+# Where parsed charts and other derived data are cached between runs
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "openkeys")
+
+# Profiling: frames kept in the ring buffers, and where F4 writes traces
+PROFILER_FRAMES = 600
+PROFILER_TRACE_DIR = "traces"
+
+# Built-in synth (core/synth.py): plays what the student plays
+AUDIO_ENABLED = True
+AUDIO_DEVICE_NAME = None       # None = first output device
+AUDIO_SAMPLE_RATE = 44100
+AUDIO_BUFFER_FRAMES = 256      # Smaller = lower latency, more risk of dropouts
+AUDIO_POLYPHONY = 24           # Voices before the oldest one is stolen
+AUDIO_LATENCY_PROBE = False    # Measure MIDI-in -> sound-out latency
+
+# Play Along (core/playback.py): the loaded piece's other tracks are played
+# on a scheduler thread while the student plays along
+PLAYBACK_OUTPUT = None         # None = built-in synth, "keyboard" = the keyboard's MIDI out,
+                               # "null" = nowhere (benchmarks), or part of an output port's name
+PLAYBACK_SPIN_SECONDS = 0.002  # Sleep until this close to an event, then busy-wait
+PLAYBACK_SPIN_MAX_SECONDS = 0.004  # ...widened up to this if wake-ups turn out late (never more)
+PLAYBACK_SWITCH_INTERVAL = 0.0005  # GIL switch interval while playing (sys.setswitchinterval)
+PLAYBACK_REALTIME_PRIORITY = 10   # SCHED_FIFO priority for the scheduler thread (Linux, needs
+                                  # permission; None = don't try)
+PLAYBACK_NICE = -10               # ...else this nice value (None = leave it)
+PLAYBACK_JITTER_LIMIT_MS = 2.0     # Logged as a warning if an event goes out later than this
+PLAYBACK_JITTER_SAMPLES = 4096     # Lateness samples kept for the jitter report
+
+# Rhythm analytics: events preallocated per session (grows if exceeded)
+ANALYTICS_CAPACITY = 65536
+
+# Practice history (core/history.py)
+HISTORY_ENABLED = True
+HISTORY_DB_PATH = os.path.join(os.path.expanduser("~"), ".local", "share", "openkeys", "history.db")
+HISTORY_BATCH_SIZE = 64        # Wake the writer early once this many attempts are queued
+HISTORY_FLUSH_SECONDS = 2.0    # Otherwise write at least this often
+# Whose history is being recorded (one machine, many students)
+CURRENT_USER = os.environ.get("OPENKEYS_USER", "guest")
+
+# Session recording (core/session_log.py): every run is logged so reported
+# bugs can be replayed with `python replay.py <log>`
+SESSION_RECORDING = True
+SESSION_LOG_DIR = os.path.join(CACHE_DIR, "sessions")
+SESSION_LOG_KEEP = 20          # Older logs are deleted at startup
+
+# Event log (core/event_log.py): structured events written to a rotating
+# file by a background thread instead of print() in the frame loop
+LOG_PATH = os.path.join(CACHE_DIR, "logs", "openkeys.log")
+LOG_LEVEL = "INFO"             # DEBUG / INFO / WARNING / ERROR / OFF
+# Per-category overrides, e.g. {"judge": "DEBUG"} logs every hit and miss
+LOG_CATEGORY_LEVELS = {}
+LOG_CONSOLE_LEVEL = "INFO"     # Also echo these to stdout (None = file only)
+LOG_MAX_BYTES = 1024 * 1024    # Rotate after this size...
+LOG_BACKUPS = 3                # ...keeping this many old files
+LOG_FLUSH_SECONDS = 0.5
+LOG_QUEUE_SIZE = 10000         # Events buffered between flushes (oldest dropped)
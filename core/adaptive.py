@@ -0,0 +1,104 @@
+# core/adaptive.py
+import random
+
+class FenwickSampler:
+    """
+    Weighted random choice over n items (a Fenwick / binary indexed tree of
+    weights). Changing one weight and drawing a sample are both O(log n).
+    """
+    def __init__(self, n):
+        self.n = n
+        self.tree = [0.0] * (n + 1)
+        self.weights = [0.0] * n
+        self.total = 0.0
+        self.top_step = 1
+        while self.top_step * 2 <= n:
+            self.top_step *= 2
+
+    def set_weight(self, index, weight):
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        self.total += delta
+        i = index + 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self, rng=random):
+        """Returns an index with probability weight / total (None if all weights are 0)."""
+        if self.total <= 0:
+            return None
+        target = rng.random() * self.total
+        # Walk down the tree: find the first index whose prefix sum exceeds target
+        pos = 0
+        step = self.top_step
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        # Float round-off in the tree's sums can land on a zero weight after
+        # the last non-zero one (or past the end): step back onto it
+        pos = min(pos, self.n - 1)
+        while pos > 0 and self.weights[pos] == 0:
+            pos -= 1
+        return pos
+
+# How strongly weak notes are favoured
+ERROR_SMOOTHING = 0.3       # EWMA factor per attempt
+RESPONSE_SMOOTHING = 0.3
+PRIOR_ERROR_RATE = 0.3      # Assumed for notes never practised
+TARGET_RESPONSE = 1.5       # Seconds; slower answers count as weakness
+ERROR_WEIGHT = 8.0
+RESPONSE_WEIGHT = 2.0
+
+class AdaptiveNoteSelector:
+    """
+    Picks the next target note with probability that grows with the note's
+    error rate and response time (spaced-repetition style). Per-note stats
+    are exponentially weighted, so recent attempts matter most; each
+    attempt updates one weight in O(log 128).
+    """
+    def __init__(self, start_note, end_note, rng=random):
+        self.start_note = start_note
+        self.end_note = end_note
+        self.rng = rng
+        self.sampler = FenwickSampler(128)
+        self.error_rate = [PRIOR_ERROR_RATE] * 128
+        self.response = [TARGET_RESPONSE] * 128  # Seconds
+        for note in range(start_note, end_note + 1):
+            self._update_weight(note)
+
+    def _update_weight(self, note):
+        slowness = min(self.response[note] / TARGET_RESPONSE, 3.0)
+        self.sampler.set_weight(note, 1.0 + ERROR_WEIGHT * self.error_rate[note]
+                                + RESPONSE_WEIGHT * slowness)
+
+    def load_history(self, note_stats):
+        """Starts from stored history: {note: (attempts, errors, mean response ms)}."""
+        for note, (attempts, errors, response_ms) in note_stats.items():
+            if not self.start_note <= note <= self.end_note or not attempts:
+                continue
+            # Blend with the prior so one lucky/unlucky attempt doesn't dominate
+            self.error_rate[note] = (errors + PRIOR_ERROR_RATE * 2) / (attempts + 2)
+            if response_ms is not None:
+                self.response[note] = response_ms / 1000
+            self._update_weight(note)
+
+    def record(self, note, correct, response_time=None):
+        """One attempt at `note`. response_time is in seconds (correct answers)."""
+        outcome = 0.0 if correct else 1.0
+        self.error_rate[note] += ERROR_SMOOTHING * (outcome - self.error_rate[note])
+        if response_time is not None:
+            self.response[note] += RESPONSE_SMOOTHING * (response_time - self.response[note])
+        self._update_weight(note)
+
+    def next_note(self, exclude=None):
+        """Draws the next target, avoiding an immediate repeat of `exclude`."""
+        note = self.sampler.sample(self.rng)
+        for _ in range(3):
+            if note != exclude:
+                break
+            note = self.sampler.sample(self.rng)
+        return note
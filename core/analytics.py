@@ -0,0 +1,128 @@
+# core/analytics.py
+import numpy as np
+import config
+
+# Judgement bands (seconds of |offset|); anything else inside the hit window is 'OK'
+PERFECT_WINDOW = 0.040
+GOOD_WINDOW = 0.090
+HISTOGRAM_BIN_MS = 10
+ROLLING_WINDOW = 16  # Hits per point of the rolling-offset curve
+
+class TimingAnalytics:
+    """
+    Records every hit and miss of a rhythm session into preallocated NumPy
+    arrays (O(1) per event, no per-event objects). Running sums keep a live
+    HUD summary up to date; full statistics are computed in batch by summary().
+    Offsets are press time - expected time, in seconds: negative = early.
+    """
+    def __init__(self, capacity=None):
+        self.capacity = capacity or config.ANALYTICS_CAPACITY
+        self.notes = np.zeros(self.capacity, dtype=np.uint8)
+        self.times = np.zeros(self.capacity, dtype=np.float64)   # Expected hit time (song time)
+        self.offsets = np.zeros(self.capacity, dtype=np.float32) # NaN for misses
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        # Live counters for the HUD
+        self.hits = 0
+        self.misses = 0
+        self.early = 0
+        self.late = 0
+        self.offset_sum = 0.0
+        self.offset_sq_sum = 0.0
+
+    def _append(self, note, hit_time, offset):
+        if self.count == self.capacity:
+            # Out of room: double (amortised O(1), never happens in normal sessions)
+            self.capacity *= 2
+            self.notes = np.resize(self.notes, self.capacity)
+            self.times = np.resize(self.times, self.capacity)
+            self.offsets = np.resize(self.offsets, self.capacity)
+        i = self.count
+        self.notes[i] = note
+        self.times[i] = hit_time
+        self.offsets[i] = offset
+        self.count = i + 1
+
+    def record_hit(self, note, hit_time, offset):
+        """Stores a hit and returns its judgement: 'PERFECT', 'GOOD' or 'OK'."""
+        self._append(note, hit_time, offset)
+        self.hits += 1
+        self.offset_sum += offset
+        self.offset_sq_sum += offset * offset
+        error = abs(offset)
+        if error <= PERFECT_WINDOW:
+            return 'PERFECT'
+        if offset < 0:
+            self.early += 1
+        else:
+            self.late += 1
+        return 'GOOD' if error <= GOOD_WINDOW else 'OK'
+
+    def record_miss(self, note, hit_time):
+        self._append(note, hit_time, np.nan)
+        self.misses += 1
+
+    def live(self):
+        """Cheap running summary for the HUD (no array work)."""
+        total = self.hits + self.misses
+        mean = self.offset_sum / self.hits if self.hits else 0.0
+        variance = self.offset_sq_sum / self.hits - mean * mean if self.hits else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'accuracy': self.hits / total if total else 0.0,
+            'mean_offset_ms': mean * 1000,
+            'std_offset_ms': max(variance, 0.0) ** 0.5 * 1000,
+            'early': self.early,
+            'late': self.late,
+        }
+
+    def summary(self, hit_window=0.25):
+        """Full session statistics, computed in batch over the recorded arrays."""
+        n = self.count
+        notes = self.notes[:n]
+        times = self.times[:n]
+        offsets = self.offsets[:n]
+        hit_mask = ~np.isnan(offsets)
+        hit_offsets_ms = offsets[hit_mask].astype(np.float64) * 1000
+        hit_times = times[hit_mask]
+
+        # Early/late histogram across the whole hit window
+        edge = int(np.ceil(hit_window * 1000 / HISTOGRAM_BIN_MS)) * HISTOGRAM_BIN_MS
+        bins = np.arange(-edge, edge + HISTOGRAM_BIN_MS, HISTOGRAM_BIN_MS)
+        histogram, _ = np.histogram(hit_offsets_ms, bins=bins)
+
+        # Per-pitch accuracy
+        attempts = np.bincount(notes, minlength=128)
+        hits_per_note = np.bincount(notes[hit_mask], minlength=128)
+        played = np.flatnonzero(attempts)
+        per_note = {int(note): float(hits_per_note[note] / attempts[note]) for note in played}
+
+        # Rolling mean offset and tempo drift (how the offset moves over the session)
+        rolling = np.empty(0)
+        drift = 0.0
+        if len(hit_offsets_ms) >= ROLLING_WINDOW:
+            csum = np.cumsum(np.insert(hit_offsets_ms, 0, 0.0))
+            rolling = (csum[ROLLING_WINDOW:] - csum[:-ROLLING_WINDOW]) / ROLLING_WINDOW
+        if len(hit_offsets_ms) >= 2 and np.ptp(hit_times) > 0:
+            # Least-squares slope, ms of offset per minute of song:
+            # positive = gradually dragging behind, negative = rushing ahead
+            drift = float(np.polyfit(hit_times, hit_offsets_ms, 1)[0] * 60)
+
+        return {
+            'hits': int(hit_mask.sum()),
+            'misses': int(n - hit_mask.sum()),
+            'accuracy': float(hit_mask.mean()) if n else 0.0,
+            'mean_offset_ms': float(hit_offsets_ms.mean()) if len(hit_offsets_ms) else 0.0,
+            'median_offset_ms': float(np.median(hit_offsets_ms)) if len(hit_offsets_ms) else 0.0,
+            'std_offset_ms': float(hit_offsets_ms.std()) if len(hit_offsets_ms) else 0.0,
+            'early': int((hit_offsets_ms < -PERFECT_WINDOW * 1000).sum()),
+            'late': int((hit_offsets_ms > PERFECT_WINDOW * 1000).sum()),
+            'histogram_bins_ms': bins,
+            'histogram': histogram,
+            'per_note_accuracy': per_note,
+            'rolling_offset_ms': rolling,
+            'tempo_drift_ms_per_min': drift,
+        }
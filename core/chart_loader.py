@@ -0,0 +1,161 @@
+# core/chart_loader.py
+import hashlib
+import os
+import mido
+import numpy as np
+import config
+from core import event_log
+
+log = event_log.get('chart')
+
+# One row per note, sorted by time. Compact enough to keep a whole piece in memory.
+CHART_DTYPE = np.dtype([
+    ('time', 'f8'),       # Onset in seconds from the start of the file
+    ('note', 'u1'),       # MIDI number
+    ('duration', 'f4'),   # Seconds
+    ('velocity', 'u1'),
+    ('track', 'u2'),      # Track index in the .mid file
+    ('channel', 'u1'),    # MIDI channel (tells parts apart in a single-track file)
+])
+
+# What loading a missing, unreadable or corrupt .mid file can raise
+LOAD_ERRORS = (OSError, EOFError, ValueError, KeyError, IndexError)
+
+# Bump when the parser output changes, so stale sidecar caches are ignored
+CHART_CACHE_VERSION = 2
+
+def load_chart(path, cache_dir=None):
+    """
+    Loads a Standard MIDI File as a time-sorted CHART_DTYPE array.
+    Parsed charts are cached as <sha1>.npy so reopening a file is instant.
+    """
+    return _load_cached(path, '.npy', parse_midi_file, cache_dir)
+
+def load_bars(path, cache_dir=None):
+    """
+    Start time (seconds) of every bar of a .mid file, plus the end of the
+    last bar, so bar i runs from bars[i] to bars[i + 1]. Cached like charts.
+    """
+    return _load_cached(path, '.bars.npy', parse_bars, cache_dir)
+
+def _load_cached(path, suffix, parse, cache_dir):
+    cache_dir = cache_dir or os.path.join(config.CACHE_DIR, 'charts')
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data + bytes([CHART_CACHE_VERSION])).hexdigest()
+    cache_path = os.path.join(cache_dir, digest + suffix)
+
+    if os.path.exists(cache_path):
+        try:
+            return np.load(cache_path)
+        except (OSError, ValueError):
+            pass  # Corrupt cache: fall through and re-parse
+
+    result = parse(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename, so a crash never leaves a half-written cache
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, result)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        log.warning('cache_not_written', path=cache_path, error=str(e))
+    return result
+
+def parse_midi_file(path):
+    """Parses a .mid file into a CHART_DTYPE array (no caching)."""
+    mid = mido.MidiFile(path, clip=True)
+
+    # 1. Walk every track in ticks: collect tempo changes and paired notes
+    tempo_changes = [(0, 500000)]  # (tick, microseconds per beat); 120 BPM default
+    notes = []  # (start_tick, end_tick, note, velocity, track, channel)
+    for track_index, track in enumerate(mid.tracks):
+        tick = 0
+        open_notes = {}  # (channel, note) -> list of (start_tick, velocity)
+        for msg in track:
+            tick += msg.time
+            if msg.type == 'set_tempo':
+                tempo_changes.append((tick, msg.tempo))
+            elif msg.type == 'note_on' and msg.velocity > 0:
+                open_notes.setdefault((msg.channel, msg.note), []).append((tick, msg.velocity))
+            elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
+                started = open_notes.get((msg.channel, msg.note))
+                if started:
+                    start_tick, velocity = started.pop(0)  # First on, first off
+                    notes.append((start_tick, tick, msg.note, velocity, track_index, msg.channel))
+        # Notes never released end with their track
+        for (channel, note), started in open_notes.items():
+            for start_tick, velocity in started:
+                notes.append((start_tick, tick, note, velocity, track_index, channel))
+
+    chart = np.zeros(len(notes), dtype=CHART_DTYPE)
+    if not notes:
+        return chart
+
+    # 2. Tempo map: seconds at the start of each constant-tempo segment
+    ticks_to_seconds = _tempo_map(tempo_changes, mid.ticks_per_beat)
+
+    # 3. Convert all notes at once
+    raw = np.array(notes, dtype=np.int64)
+    start = ticks_to_seconds(raw[:, 0])
+    end = ticks_to_seconds(raw[:, 1])
+    chart['time'] = start
+    chart['duration'] = end - start
+    chart['note'] = raw[:, 2]
+    chart['velocity'] = raw[:, 3]
+    chart['track'] = raw[:, 4]
+    chart['channel'] = raw[:, 5]
+
+    # Stable sort keeps chords in track order
+    return chart[np.argsort(chart['time'], kind='stable')]
+
+def _tempo_map(tempo_changes, ticks_per_beat):
+    """Returns a vectorised ticks -> seconds function for a list of (tick, tempo) changes."""
+    tempo_changes.sort(key=lambda change: change[0])
+    seg_ticks = np.array([t for t, _ in tempo_changes], dtype=np.int64)
+    seg_tempos = np.array([tempo for _, tempo in tempo_changes], dtype=np.float64)
+    sec_per_tick = seg_tempos / (1e6 * ticks_per_beat)
+    seg_seconds = np.concatenate(([0.0], np.cumsum(np.diff(seg_ticks) * sec_per_tick[:-1])))
+
+    def ticks_to_seconds(ticks):
+        seg = np.searchsorted(seg_ticks, ticks, side='right') - 1
+        return seg_seconds[seg] + (ticks - seg_ticks[seg]) * sec_per_tick[seg]
+    return ticks_to_seconds
+
+def parse_bars(path):
+    """Bar start times of a .mid file (see load_bars), from its time signatures and tempo map."""
+    mid = mido.MidiFile(path, clip=True)
+    tempo_changes = [(0, 500000)]
+    signatures = [(0, 4, 4)]  # (tick, numerator, denominator); 4/4 default
+    end_tick = 0
+    for track in mid.tracks:
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            if msg.type == 'set_tempo':
+                tempo_changes.append((tick, msg.tempo))
+            elif msg.type == 'time_signature':
+                signatures.append((tick, msg.numerator, msg.denominator))
+        end_tick = max(end_tick, tick)
+    signatures.sort(key=lambda signature: signature[0])
+
+    # A bar line every numerator beats of the current signature; a new
+    # signature always starts a new bar
+    bar_ticks = []
+    tick = 0
+    index = 0
+    while True:
+        while index + 1 < len(signatures) and signatures[index + 1][0] <= tick:
+            index += 1
+        bar_ticks.append(tick)
+        if tick >= end_tick:
+            break
+        _, numerator, denominator = signatures[index]
+        tick += max(1, round(mid.ticks_per_beat * 4 * numerator / denominator))
+        if index + 1 < len(signatures) and signatures[index + 1][0] < tick:
+            tick = signatures[index + 1][0]
+    if len(bar_ticks) == 1:
+        bar_ticks.append(max(1, mid.ticks_per_beat * 4))  # Empty file: one bar of 4/4
+
+    return _tempo_map(tempo_changes, mid.ticks_per_beat)(np.array(bar_ticks, dtype=np.int64))
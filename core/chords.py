@@ -0,0 +1,174 @@
+# core/chords.py
+import collections
+from core.notes import NOTE_NAMES
+
+# (suffix, intervals above the root). Earlier entries win when two
+# templates share a pitch-class set and the bass can't decide.
+CHORD_TYPES = [
+    ('', (0, 4, 7)),            # Major
+    ('m', (0, 3, 7)),           # Minor
+    ('dim', (0, 3, 6)),
+    ('aug', (0, 4, 8)),
+    ('sus4', (0, 5, 7)),
+    ('sus2', (0, 2, 7)),
+    ('7', (0, 4, 7, 10)),
+    ('maj7', (0, 4, 7, 11)),
+    ('m7', (0, 3, 7, 10)),
+    ('m7b5', (0, 3, 6, 10)),
+    ('dim7', (0, 3, 6, 9)),
+    ('mMaj7', (0, 3, 7, 11)),
+    ('6', (0, 4, 7, 9)),
+    ('m6', (0, 3, 7, 9)),
+    ('add9', (0, 2, 4, 7)),
+    ('7sus4', (0, 5, 7, 10)),
+    ('5', (0, 7)),              # Power chord
+]
+INVERSION_NAMES = ['root position', '1st inversion', '2nd inversion', '3rd inversion']
+
+class ChordMatch(collections.namedtuple('ChordMatch', ['root', 'quality', 'inversion', 'bass'])):
+    """root/bass are pitch classes (0 = C), quality a CHORD_TYPES suffix."""
+    @property
+    def name(self):
+        name = NOTE_NAMES[self.root] + self.quality
+        if self.bass != self.root:
+            name += '/' + NOTE_NAMES[self.bass]  # Slash chord for inversions
+        return name
+
+    @property
+    def inversion_name(self):
+        return INVERSION_NAMES[self.inversion]
+
+def pitch_class_mask(pitch_classes):
+    mask = 0
+    for pc in pitch_classes:
+        mask |= 1 << (pc % 12)
+    return mask
+
+def _build_table():
+    """
+    One entry per 12-bit pitch-class set (4096): the tuple of (root, quality,
+    intervals) readings of that set. Symmetric chords (aug, dim7) and
+    pairs like C6 / Am7 have several readings; the bass picks between them.
+    """
+    table = [()] * 4096
+    for quality, intervals in CHORD_TYPES:
+        for root in range(12):
+            mask = pitch_class_mask(root + i for i in intervals)
+            table[mask] = table[mask] + ((root, quality, intervals),)
+    return table
+
+CHORD_TABLE = _build_table()
+
+def recognize(mask, bass_pc):
+    """Names the chord for a pitch-class mask and bass pitch class, or None. O(1)."""
+    readings = CHORD_TABLE[mask & 0xFFF]
+    if not readings:
+        return None
+    # Bass rule: prefer the reading whose root is in the bass (root position)
+    root, quality, intervals = readings[0]
+    for reading in readings:
+        if reading[0] == bass_pc:
+            root, quality, intervals = reading
+            break
+    inversion = intervals.index((bass_pc - root) % 12)
+    return ChordMatch(root, quality, inversion, bass_pc)
+
+def readings(mask, bass_pc):
+    """Every way to name the set (e.g. both Ab6 and Fm7/Ab), for exercises that accept any."""
+    return [ChordMatch(root, quality, intervals.index((bass_pc - root) % 12), bass_pc)
+            for root, quality, intervals in CHORD_TABLE[mask & 0xFFF]]
+
+class ChordTracker:
+    """
+    Follows note_on/note_off/sustain and keeps the sounding pitch-class set
+    up to date in O(1) per message, so recognizing the current chord is a
+    single table lookup however many keys are down.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.pc_counts = [0] * 12   # Sounding notes per pitch class
+        self.mask = 0               # Bit per pitch class with count > 0
+        self.held = 0               # Bit per MIDI note: key down
+        self.sustained = 0          # Bit per MIDI note: key up but held by the pedal
+        self.pedal = False
+
+    def _sounding(self):
+        return self.held | self.sustained
+
+    def _add(self, note):
+        pc = note % 12
+        self.pc_counts[pc] += 1
+        self.mask |= 1 << pc
+
+    def _remove(self, note):
+        pc = note % 12
+        self.pc_counts[pc] -= 1
+        if self.pc_counts[pc] == 0:
+            self.mask &= ~(1 << pc)
+
+    def note_on(self, note):
+        bit = 1 << note
+        if not self._sounding() & bit:
+            self._add(note)
+        self.held |= bit
+        self.sustained &= ~bit
+
+    def note_off(self, note):
+        bit = 1 << note
+        if not self.held & bit:
+            return
+        self.held &= ~bit
+        if self.pedal:
+            self.sustained |= bit
+        else:
+            self._remove(note)
+
+    def set_pedal(self, down):
+        self.pedal = down
+        if not down:
+            # Release everything the pedal was holding
+            sustained = self.sustained
+            self.sustained = 0
+            while sustained:
+                low_bit = sustained & -sustained
+                self._remove(low_bit.bit_length() - 1)
+                sustained ^= low_bit
+
+    def process(self, msg):
+        if msg.type == 'note_on' and msg.velocity > 0:
+            self.note_on(msg.note)
+        elif msg.type == 'note_off' or msg.type == 'note_on':
+            self.note_off(msg.note)
+        elif msg.type == 'control_change' and msg.control == 64:
+            self.set_pedal(msg.value >= 64)
+
+    def sounding_notes(self):
+        """Every sounding MIDI note (held or sustained), lowest first."""
+        notes = []
+        sounding = self._sounding()
+        while sounding:
+            low_bit = sounding & -sounding
+            notes.append(low_bit.bit_length() - 1)
+            sounding ^= low_bit
+        return notes
+
+    def bass_note(self):
+        """Lowest sounding MIDI note, or None."""
+        sounding = self._sounding()
+        if not sounding:
+            return None
+        return (sounding & -sounding).bit_length() - 1
+
+    def current(self):
+        bass = self.bass_note()
+        if bass is None:
+            return None
+        return recognize(self.mask, bass % 12)
+
+    def readings(self):
+        bass = self.bass_note()
+        if bass is None:
+            return []
+        return readings(self.mask, bass % 12)
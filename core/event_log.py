@@ -0,0 +1,154 @@
+# core/event_log.py
+import collections
+import json
+import os
+import threading
+import time
+import config
+
+# Game code logs structured events instead of printing:
+#
+#     log = event_log.get('judge')
+#     log.debug('hit', note=60, offset_ms=-12.5)
+#
+# An event is appended to an in-memory queue (no I/O, no formatting) and a
+# background thread writes queued events in batches, as JSON lines, to a
+# rotating file (and echoes them to the console if configured). A category
+# whose level is disabled has its methods replaced by a no-op, so a
+# disabled log call costs one function call and nothing else.
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR, 'OFF': OFF}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+# (unix time, level, category, event, fields). deque.append is atomic, so
+# any thread can log without a lock; when full the oldest events are dropped.
+_queue = collections.deque(maxlen=config.LOG_QUEUE_SIZE)
+_categories = {}
+_writer = None
+
+def _noop(event, **fields):
+    pass
+
+class Category:
+    """The logger for one part of the game (see get())."""
+    def __init__(self, name):
+        self.name = name
+        self.level = OFF
+        self.apply(level_for(name))
+
+    def apply(self, level):
+        self.level = level
+        for level_name, value in LEVELS.items():
+            if value == OFF:
+                continue
+            method = self._emitter(value) if value >= level else _noop
+            setattr(self, level_name.lower(), method)
+
+    def _emitter(self, level):
+        name = self.name
+        append = _queue.append
+        def emit(event, **fields):
+            append((time.time(), level, name, event, fields))
+        return emit
+
+    def is_enabled(self, level):
+        """For callers that would do real work just to build the fields."""
+        return level >= self.level
+
+def level_for(category):
+    name = config.LOG_CATEGORY_LEVELS.get(category, config.LOG_LEVEL)
+    return LEVELS[name.upper()]
+
+def get(category):
+    """Returns the (shared) logger for a category, e.g. 'midi' or 'judge'."""
+    logger = _categories.get(category)
+    if logger is None:
+        logger = _categories.setdefault(category, Category(category))
+    return logger
+
+def configure(level=None, category_levels=None):
+    """Changes levels at runtime; every existing logger picks them up."""
+    if level is not None:
+        config.LOG_LEVEL = level
+    if category_levels is not None:
+        config.LOG_CATEGORY_LEVELS = dict(category_levels)
+    for name, logger in _categories.items():
+        logger.apply(level_for(name))
+
+class LogWriter:
+    """
+    Drains the queue every `flush_seconds` and appends the batch to `path`,
+    rotating to path.1 .. path.N once the file passes max_bytes.
+    """
+    def __init__(self, path, max_bytes, backups, flush_seconds, console_level):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_seconds = flush_seconds
+        self.console_level = LEVELS[console_level.upper()] if console_level else OFF
+        self.stop_event = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+        self.thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.wait(self.flush_seconds):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        batch = []
+        while _queue:
+            batch.append(_queue.popleft())
+        if not batch:
+            return
+        lines = []
+        for ts, level, category, event, fields in batch:
+            record = {'ts': round(ts, 6), 'level': LEVEL_NAMES[level], 'cat': category, 'event': event}
+            record.update(fields)
+            lines.append(json.dumps(record, default=str))
+            if level >= self.console_level:
+                details = " ".join(f"{key}={value}" for key, value in fields.items())
+                print(f"[{category}] {event} {details}".rstrip())
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+        if self.file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.file.close()
+
+def start(path=None):
+    """Starts the background writer (main.py). Until then events only queue up."""
+    global _writer
+    if _writer is None:
+        _writer = LogWriter(path or config.LOG_PATH, config.LOG_MAX_BYTES, config.LOG_BACKUPS,
+                            config.LOG_FLUSH_SECONDS, config.LOG_CONSOLE_LEVEL)
+    return _writer
+
+def close():
+    """Writes whatever is still queued and stops the writer."""
+    global _writer
+    if _writer:
+        _writer.close()
+        _writer = None
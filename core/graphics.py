@@ -13,6 +13,27 @@ COLOR_BLACK_KEY = (20, 20, 20)
 COLOR_ACTIVE = (100, 200, 255)  # Blue for pressed keys
 COLOR_TARGET = (50, 200, 50)    # Green for correct keys
 COLOR_WRONG = (200, 50, 50)     # Red for wrong keys
+COLOR_SUSTAINED = (60, 110, 140)  # Released, but still held by the sustain pedal
+
+# Pressed keys are shaded by how hard they were played (soft = darker)
+VELOCITY_LEVELS = 4
+
+# Key layers: black keys are drawn (and hit-tested) on top of white keys
+LAYER_WHITE = 0
+LAYER_BLACK = 1
+
+# Fill colour per key state ('idle' and 'hint' keep the key's own colour)
+KEY_STATE_COLORS = {
+    'active': COLOR_ACTIVE,
+    'target': COLOR_TARGET,
+    'wrong': COLOR_WRONG,
+    'sustained': COLOR_SUSTAINED,
+}
+IDLE = ('idle', VELOCITY_LEVELS - 1)  # (state, velocity level) of an untouched key
+
+def _shade(color, level):
+    factor = 0.4 + 0.6 * (level + 1) / VELOCITY_LEVELS
+    return tuple(int(c * factor) for c in color)
 
 class VirtualPiano:
     def __init__(self, start_note, end_note, x, y, width, height):
@@ -26,7 +47,21 @@ class VirtualPiano:
         # Pre-calculate key positions
         self.white_keys = []
         self.black_keys = []
+        self.rect = pygame.Rect(x, y, width, height)
+
+        # Dense note-indexed geometry (MIDI 0-127), None/-1 outside the range.
+        # Every per-note lookup (spawning, highlighting, hit-testing) is O(1).
+        self.key_rects = [None] * 128    # midi number -> rect
+        self.key_colors = [None] * 128   # midi number -> 'white' / 'black'
+        self.key_layers = [-1] * 128     # midi number -> LAYER_WHITE / LAYER_BLACK
         self._generate_keys()
+        self._build_hit_columns()
+
+        # Cached rendering: idle piano background + one surface per key size/state
+        self._state_surfaces = {}
+        self._key_states = {}  # note -> state as last drawn (idle keys omitted)
+        self._needs_full_redraw = True
+        self._bake()
 
     def _generate_keys(self):
         """Calculates the rectangle for every key based on the range."""
@@ -55,12 +90,61 @@ class VirtualPiano:
                 # It's a white key
                 rect = pygame.Rect(current_x, self.y, key_w - 1, self.height) # -1 for gap
                 self.white_keys.append({'note': midi_num, 'rect': rect})
+                self._index_key(midi_num, rect, 'white', LAYER_WHITE)
                 current_x += key_w
             else:
                 # It's a black key - Draw it shifted back by half a width
                 # Note: Black keys don't advance current_x!
                 rect = pygame.Rect(current_x - (black_key_w / 2), self.y, black_key_w, black_key_h)
                 self.black_keys.append({'note': midi_num, 'rect': rect})
+                self._index_key(midi_num, rect, 'black', LAYER_BLACK)
+
+    def _index_key(self, midi_num, rect, color, layer):
+        self.key_rects[midi_num] = rect
+        self.key_colors[midi_num] = color
+        self.key_layers[midi_num] = layer
+
+    def _build_hit_columns(self):
+        """
+        Builds one lookup column per pixel across the piano, so note_at()
+        is two list reads. White columns include the 1px gap to the next key.
+        """
+        self._white_columns = [-1] * self.rect.width
+        self._black_columns = [-1] * self.rect.width
+        self._black_bottom = self.rect.y
+        for midi_num in range(self.start_note, self.end_note + 1):
+            rect = self.key_rects[midi_num]
+            if self.key_layers[midi_num] == LAYER_BLACK:
+                columns = self._black_columns
+                right = rect.right
+                self._black_bottom = rect.bottom
+            else:
+                columns = self._white_columns
+                right = rect.right + 1
+            for col in range(max(rect.x - self.rect.x, 0), min(right - self.rect.x, self.rect.width)):
+                columns[col] = midi_num
+
+    def has_key(self, midi_num):
+        """True if the note is on this keyboard."""
+        return midi_num is not None and 0 <= midi_num < 128 and self.key_rects[midi_num] is not None
+
+    def get_key_rect(self, midi_num):
+        """Returns the rect of a key, or None if the note is off the keyboard."""
+        if 0 <= midi_num < 128:
+            return self.key_rects[midi_num]
+        return None
+
+    def note_at(self, x, y):
+        """Maps a screen pixel to the MIDI note under it (black keys first), or None."""
+        if not self.rect.collidepoint(x, y):
+            return None
+        col = int(x) - self.rect.x
+        if y < self._black_bottom:
+            note = self._black_columns[col]
+            if note >= 0:
+                return note
+        note = self._white_columns[col]
+        return note if note >= 0 else None
 
     def _is_black_key(self, midi_num):
         """Returns True if the midi number corresponds to a sharp/flat."""
@@ -70,45 +154,119 @@ class VirtualPiano:
         index = midi_num % 12
         return index in [1, 3, 6, 8, 10]
 
-    def draw(self, screen, active_notes=None, target_note=None):
+    def _bake(self):
+        """Pre-renders the idle piano once into a cached background surface."""
+        self.background = pygame.Surface(self.rect.size)
+        self.background.fill(config.COLOR_BG)
+        for key in self.white_keys + self.black_keys: # White first, black on top
+            surf = self._key_surface(key['rect'], self.key_layers[key['note']] == LAYER_BLACK, IDLE)
+            self.background.blit(surf, key['rect'].move(-self.x, -self.y))
+
+    def _key_surface(self, rect, is_black, key_state):
+        """Returns a cached surface for one key size + (state, velocity level), built on first use."""
+        cache_key = (rect.width, rect.height, is_black, key_state)
+        surf = self._state_surfaces.get(cache_key)
+        if surf is None:
+            state, level = key_state
+            base = COLOR_BLACK_KEY if is_black else COLOR_WHITE_KEY
+            surf = pygame.Surface(rect.size)
+            surf.fill(_shade(KEY_STATE_COLORS[state], level) if state in KEY_STATE_COLORS else base)
+            if state == 'hint':
+                # Outline only: the user should play this key but isn't yet
+                pygame.draw.rect(surf, COLOR_TARGET, surf.get_rect(), 2 if is_black else 3)
+            self._state_surfaces[cache_key] = surf
+        return surf
+
+    def _key_state(self, note, active_notes, targets):
+        if note in active_notes:
+            # Check if it's the target or just a press
+            if note in targets:
+                return 'target'
+            elif targets:
+                # If there is a target but we pressed this, it's wrong
+                return 'wrong'
+            return 'active'
+        if note in targets:
+            return 'hint'
+        return 'idle'
+
+    def invalidate(self):
+        """Forces the next draw() to repaint the whole piano (e.g. after screen.fill)."""
+        self._needs_full_redraw = True
+
+    def draw(self, screen, active_notes=None, target_note=None, batch=None):
         """
-        Draws the piano.
-        active_notes: list or set of MIDI numbers currently pressed.
-        target_note: a specific note to highlight (optional).
+        Draws the piano, only touching keys whose state changed since last call.
+        active_notes: list or set of MIDI numbers currently pressed, or a
+                      core.keyboard_state.KeyboardState (pressed keys are then
+                      shaded by velocity and pedal-held notes shown too).
+        target_note: a specific note to highlight (optional), or a set of
+                     notes (e.g. every key belonging to a chord).
+        batch: a list to append (surface, rect) pairs to instead of blitting,
+               so several pianos can be drawn in one Surface.blits() call.
+        Returns the list of screen rects that changed (for display.update).
         """
         if active_notes is None:
             active_notes = set()
+        if target_note is None:
+            targets = ()
+        elif isinstance(target_note, int):
+            targets = (target_note,)
+        else:
+            targets = target_note
 
-        # 1. Draw White Keys
-        for key in self.white_keys:
-            color = COLOR_WHITE_KEY
-            if key['note'] in active_notes:
-                # Check if it's the target or just a press
-                if key['note'] == target_note:
-                    color = COLOR_TARGET
-                elif target_note is not None:
-                     # If there is a target but we pressed this, it's wrong
-                    color = COLOR_WRONG
-                else:
-                    color = COLOR_ACTIVE
-            
-            pygame.draw.rect(screen, color, key['rect'])
-            # Draw highlight for target if user ISN'T pressing it
-            if target_note == key['note'] and key['note'] not in active_notes:
-                pygame.draw.rect(screen, COLOR_TARGET, key['rect'], 3) # Outline only
-
-        # 2. Draw Black Keys
-        for key in self.black_keys:
-            color = COLOR_BLACK_KEY
-            if key['note'] in active_notes:
-                if key['note'] == target_note:
-                    color = COLOR_TARGET
-                elif target_note is not None:
-                    color = COLOR_WRONG
-                else:
-                    color = COLOR_ACTIVE
-
-            pygame.draw.rect(screen, color, key['rect'])
-             # Draw highlight for target if user ISN'T pressing it
-            if target_note == key['note'] and key['note'] not in active_notes:
-                pygame.draw.rect(screen, COLOR_TARGET, key['rect'], 2) # Outline only
\ No newline at end of file
+        # 1. Work out the (state, velocity level) of every key that isn't idle
+        velocity = getattr(active_notes, 'velocity', None)
+        full = VELOCITY_LEVELS - 1
+        new_states = {}
+        for note in active_notes:
+            if self.has_key(note):
+                level = velocity[note] * VELOCITY_LEVELS // 128 if velocity is not None else full
+                new_states[note] = (self._key_state(note, active_notes, targets), level)
+        for note in getattr(active_notes, 'sustained_notes', ()):
+            if self.has_key(note) and note not in new_states:
+                new_states[note] = ('sustained', full)
+        for note in targets:
+            if self.has_key(note) and note not in new_states:
+                new_states[note] = ('hint', full)
+
+        # 2. Decide what to repaint
+        if self._needs_full_redraw:
+            # Full repaint: cached background + every highlighted key
+            self._needs_full_redraw = False
+            self._blit(screen, batch, self.background, self.rect)
+            changed = list(new_states)
+            dirty = [self.rect.copy()]
+        else:
+            # Partial repaint: only keys that changed state
+            changed = [n for n in set(self._key_states) | set(new_states)
+                       if self._key_states.get(n, IDLE) != new_states.get(n, IDLE)]
+            dirty = []
+        self._key_states = new_states
+
+        # 3. White keys first, then black keys on top
+        black_to_draw = set()
+        layers = self.key_layers
+        for note in changed:
+            if layers[note] == LAYER_BLACK:
+                black_to_draw.add(note)
+            else:
+                dirty.append(self._blit_key(screen, batch, note, new_states.get(note, IDLE)))
+                # A white key repaint covers the edges of its black neighbours
+                for neighbour in (note - 1, note + 1):
+                    if self.has_key(neighbour) and layers[neighbour] == LAYER_BLACK:
+                        black_to_draw.add(neighbour)
+        for note in black_to_draw:
+            dirty.append(self._blit_key(screen, batch, note, new_states.get(note, IDLE)))
+        return dirty
+
+    def _blit_key(self, screen, batch, note, key_state):
+        rect = self.key_rects[note]
+        surf = self._key_surface(rect, self.key_layers[note] == LAYER_BLACK, key_state)
+        return self._blit(screen, batch, surf, rect)
+
+    def _blit(self, screen, batch, surf, rect):
+        if batch is None:
+            return screen.blit(surf, rect)
+        batch.append((surf, rect))
+        return rect.copy()
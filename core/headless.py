@@ -0,0 +1,145 @@
+# core/headless.py
+import os
+import random
+import time
+import mido
+import pygame
+import config
+from core import timing
+from core.midi_input import MidiEvent
+
+class ScriptedMidiSource:
+    """
+    Stands in for MidiInput: replays (time, message) pairs against the
+    current clock. poll() returns every message whose time has come,
+    stamped with its scripted time (as if it arrived exactly then).
+    (time, message, port name) triples play as if from that port
+    (split-screen players).
+    """
+    def __init__(self, timed_messages, start_time=0.0):
+        self.messages = sorted(timed_messages, key=lambda pair: pair[0])
+        self.start_time = start_time
+        self.cursor = 0
+        self.dropped = 0
+        self.last_depth = 0
+
+    def poll(self):
+        events = []
+        now = timing.now() - self.start_time
+        while self.cursor < len(self.messages) and self.messages[self.cursor][0] <= now:
+            msg_time, msg, *source = self.messages[self.cursor]
+            events.append(MidiEvent(msg, self.start_time + msg_time, *source))
+            self.cursor += 1
+        self.last_depth = len(events)
+        return events
+
+    def close(self):
+        pass
+
+def generate_performance(duration, notes_per_second, note_range, seed=0):
+    """Random note_on/note_off pairs: a fake student playing for `duration` seconds."""
+    rng = random.Random(seed)
+    start, end = note_range
+    timed = []
+    t = 0.0
+    while t < duration:
+        t += rng.expovariate(notes_per_second)
+        note = rng.randint(start, end)
+        timed.append((t, mido.Message('note_on', note=note, velocity=rng.randint(40, 120))))
+        timed.append((t + rng.uniform(0.05, 0.4), mido.Message('note_off', note=note)))
+    return timed
+
+def load_performance(path, delay=0.0):
+    """Reads a recorded .mid file as (time, message) pairs, shifted by `delay` seconds."""
+    timed = []
+    t = delay
+    for msg in mido.MidiFile(path, clip=True):  # Iterating gives delta seconds
+        t += msg.time
+        if not msg.is_meta:
+            timed.append((t, msg))
+    return timed
+
+def init_headless_display():
+    """Opens a window on SDL's dummy video driver (no display needed)."""
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+    return pygame.display.set_mode((config.SCREEN_WIDTH, config.SCREEN_HEIGHT))
+
+class HeadlessRunner:
+    """
+    Drives a SceneManager the same way main.py does, but on a virtual clock
+    and without throttling. frame_dt is how much virtual time each frame takes.
+    After every frame, on_frame(frame, scene, midi_events, timings) is called
+    with the real time (seconds) spent in each scene stage.
+    """
+    def __init__(self, scene_manager, screen, frame_dt=1 / 60):
+        self.scene_manager = scene_manager
+        self.screen = screen
+        self.frame_dt = frame_dt
+        self.clock = timing.VirtualClock()
+        timing.set_clock(self.clock)
+
+    def run(self, frames, midi_source=None, on_frame=None, pygame_events=None):
+        """
+        Runs `frames` frames. pygame_events is an optional dict of
+        frame index -> list of pygame events to inject on that frame.
+        """
+        for frame in range(frames):
+            self.clock.advance(self.frame_dt)
+            events = pygame_events.get(frame, []) if pygame_events else []
+            midi_events = midi_source.poll() if midi_source else []
+            self._step(frame, events, midi_events, on_frame)
+
+    def replay(self, session, on_frame=None, realtime=False):
+        """
+        Feeds a recorded session (core.session_log.SessionLog) through the
+        scene manager: each frame runs at its recorded time with the events
+        recorded for it. Runs as fast as possible unless realtime is set.
+        Returns the number of frames replayed.
+        """
+        wall_start = time.perf_counter()
+        first_time = None
+        frame = -1
+        for frame, (frame_time, events, midi_events, size) in enumerate(session.frames()):
+            if first_time is None:
+                first_time = frame_time
+            if realtime:
+                delay = (frame_time - first_time) - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.clock.set(frame_time)
+            if size:
+                # The live window was resized (or went fullscreen) here
+                self.screen = pygame.display.set_mode(size)
+                self.scene_manager.resize(*size)
+            self._step(frame, events, midi_events, on_frame)
+        return frame + 1
+
+    def _step(self, frame, events, midi_events, on_frame):
+        perf = time.perf_counter  # Real time, for measuring work
+        timing.start_frame()
+        scene = self.scene_manager.get_active_scene()
+        self.scene_manager.feed_midi(midi_events)
+
+        t0 = perf()
+        scene.handle_input(events)
+        scene = self.scene_manager.get_active_scene()  # Same as main.py: a switch takes effect now
+        t1 = perf()
+        scene.process_midi(midi_events)
+        t2 = perf()
+        scene.update()
+        t3 = perf()
+        scene.draw(self.screen)
+        t4 = perf()
+
+        if on_frame:
+            on_frame(frame, scene, midi_events, {
+                'handle_input': t1 - t0,
+                'process_midi': t2 - t1,
+                'update': t3 - t2,
+                'draw': t4 - t3,
+            })
+
+    def close(self):
+        timing.use_real_clock()
@@ -0,0 +1,146 @@
+# core/history.py
+import collections
+import os
+import sqlite3
+import threading
+import time
+import config
+from core import event_log
+
+log = event_log.get('history')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id          INTEGER PRIMARY KEY,
+    user        TEXT    NOT NULL,
+    exercise    TEXT    NOT NULL,
+    note        INTEGER NOT NULL,
+    correct     INTEGER NOT NULL,
+    offset_ms   REAL,            -- Rhythm: press time - expected time
+    response_ms REAL,            -- Note trainer: prompt -> key press
+    ts          REAL    NOT NULL -- Unix time
+);
+CREATE INDEX IF NOT EXISTS attempts_by_user_exercise_ts ON attempts (user, exercise, ts);
+
+-- Per-day rollup, kept up to date by the writer. "Weakest notes" queries
+-- read this (at most 128 rows per user/exercise/day) instead of every attempt.
+CREATE TABLE IF NOT EXISTS daily_note_stats (
+    user             TEXT    NOT NULL,
+    exercise         TEXT    NOT NULL,
+    note             INTEGER NOT NULL,
+    day              TEXT    NOT NULL, -- YYYY-MM-DD (local)
+    attempts         INTEGER NOT NULL,
+    errors           INTEGER NOT NULL,
+    response_ms_sum  REAL    NOT NULL,
+    response_count   INTEGER NOT NULL,
+    PRIMARY KEY (user, exercise, note, day)
+);
+CREATE INDEX IF NOT EXISTS daily_by_user_exercise_day ON daily_note_stats (user, exercise, day);
+"""
+
+UPSERT_DAILY = """
+INSERT INTO daily_note_stats (user, exercise, note, day, attempts, errors, response_ms_sum, response_count)
+VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (user, exercise, note, day) DO UPDATE SET
+    attempts = attempts + 1,
+    errors = errors + excluded.errors,
+    response_ms_sum = response_ms_sum + excluded.response_ms_sum,
+    response_count = response_count + excluded.response_count
+"""
+
+class HistoryStore:
+    """
+    Local practice history (SQLite in WAL mode).
+    record() only appends to an in-memory queue; a background thread writes
+    the queue in batches, one transaction per batch, so the game loop never
+    waits on the disk. Queries run on the caller's own connection, which WAL
+    lets read while the writer is busy.
+    """
+    def __init__(self, path=None):
+        self.path = path or config.HISTORY_DB_PATH
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.pending = collections.deque()
+        self.wake = threading.Event()
+        self.running = True
+
+        # Schema is created up front so queries work before the first write
+        self.reader = self._connect()
+        self.reader.executescript(SCHEMA)
+
+        self.thread = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, much faster commits
+        return db
+
+    # --- Game-loop side (never blocks) ---------------------------------------
+
+    def record(self, exercise, note, correct, offset_ms=None, response_ms=None, user=None):
+        self.pending.append((user or config.CURRENT_USER, exercise, int(note), int(bool(correct)),
+                             offset_ms, response_ms, time.time()))
+        if len(self.pending) >= config.HISTORY_BATCH_SIZE:
+            self.wake.set()
+
+    # --- Queries -------------------------------------------------------------
+
+    def note_stats(self, exercise, user=None, since_days=None):
+        """{note: (attempts, errors, mean response ms or None)} for one user/exercise."""
+        sql = ("SELECT note, SUM(attempts), SUM(errors), SUM(response_ms_sum), SUM(response_count) "
+               "FROM daily_note_stats WHERE user = ? AND exercise = ?")
+        params = [user or config.CURRENT_USER, exercise]
+        if since_days is not None:
+            sql += " AND day >= ?"
+            params.append(time.strftime("%Y-%m-%d", time.localtime(time.time() - since_days * 86400)))
+        sql += " GROUP BY note"
+        stats = {}
+        for note, attempts, errors, response_sum, response_count in self.reader.execute(sql, params):
+            mean_response = response_sum / response_count if response_count else None
+            stats[note] = (attempts, errors, mean_response)
+        return stats
+
+    def weakest_notes(self, exercise, user=None, limit=5, since_days=None, min_attempts=3):
+        """[(note, error_rate, attempts)] worst first."""
+        ranked = [(note, errors / attempts, attempts)
+                  for note, (attempts, errors, _) in self.note_stats(exercise, user, since_days).items()
+                  if attempts >= min_attempts and errors]
+        ranked.sort(key=lambda row: row[1], reverse=True)
+        return ranked[:limit]
+
+    # --- Writer thread -------------------------------------------------------
+
+    def _writer_loop(self):
+        db = self._connect()
+        while self.running or self.pending:
+            self.wake.wait(config.HISTORY_FLUSH_SECONDS)
+            self.wake.clear()
+            self._flush(db)
+        db.close()
+
+    def _flush(self, db):
+        batch = []
+        while self.pending:
+            batch.append(self.pending.popleft())
+        if not batch:
+            return
+        daily = []
+        for user, exercise, note, correct, offset_ms, response_ms, ts in batch:
+            day = time.strftime("%Y-%m-%d", time.localtime(ts))
+            daily.append((user, exercise, note, day, 1 - correct,
+                          response_ms or 0.0, 0 if response_ms is None else 1))
+        try:
+            with db:  # One transaction for the whole batch
+                db.executemany("INSERT INTO attempts (user, exercise, note, correct, offset_ms, "
+                               "response_ms, ts) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                db.executemany(UPSERT_DAILY, daily)
+        except sqlite3.Error as e:
+            log.error('write_failed', error=str(e))
+
+    def close(self):
+        """Writes whatever is still queued and stops the writer."""
+        self.running = False
+        self.wake.set()
+        self.thread.join()
+        self.reader.close()
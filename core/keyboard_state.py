@@ -0,0 +1,81 @@
+# core/keyboard_state.py
+from array import array
+
+class KeyboardState:
+    """
+    What the student's keyboard is doing right now: one record per MIDI
+    note (0-127), stored as parallel flat arrays so each message is an O(1)
+    update and readers index straight into them.
+
+      onset[n]         timestamp of the last note_on (core.timing clock)
+      release_time[n]  timestamp of the last note_off
+      velocity[n]      velocity of the last note_on
+      released[n]      1 when the key is up
+      sustained[n]     1 while the sustain pedal (CC64) keeps a released note sounding
+
+    `down` and `sustained_notes` index the same information as sets, so
+    drawing only visits the few keys that are active. `in` and iteration
+    work on the keys that are down, so a KeyboardState can stand in for a
+    set of held notes.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.onset = array('d', bytes(8 * 128))
+        self.release_time = array('d', bytes(8 * 128))
+        self.velocity = bytearray(128)
+        self.released = bytearray(b'\x01' * 128)
+        self.sustained = bytearray(128)
+        self.down = set()
+        self.sustained_notes = set()
+        self.pedal = False
+
+    def note_on(self, note, velocity, timestamp):
+        self.onset[note] = timestamp
+        self.velocity[note] = velocity
+        self.released[note] = 0
+        self.sustained[note] = 0
+        self.down.add(note)
+        self.sustained_notes.discard(note)
+
+    def note_off(self, note, timestamp):
+        if self.released[note]:
+            return
+        self.released[note] = 1
+        self.release_time[note] = timestamp
+        self.down.discard(note)
+        if self.pedal:
+            self.sustained[note] = 1
+            self.sustained_notes.add(note)
+
+    def set_pedal(self, down):
+        self.pedal = down
+        if not down:
+            for note in self.sustained_notes:
+                self.sustained[note] = 0
+            self.sustained_notes.clear()
+
+    def update(self, midi_events):
+        """Applies a batch of MidiEvents, oldest first."""
+        for event in midi_events:
+            msg = event.message
+            if msg.type == 'note_on' and msg.velocity > 0:
+                self.note_on(msg.note, msg.velocity, event.timestamp)
+            elif msg.type == 'note_off' or msg.type == 'note_on':
+                self.note_off(msg.note, event.timestamp)
+            elif msg.type == 'control_change' and msg.control == 64:
+                self.set_pedal(msg.value >= 64)
+
+    def is_sounding(self, note):
+        """Key down, or released but held by the pedal."""
+        return not self.released[note] or self.sustained[note]
+
+    def __contains__(self, note):
+        return not self.released[note]
+
+    def __iter__(self):
+        return iter(self.down)
+
+    def __len__(self):
+        return len(self.down)
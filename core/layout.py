@@ -0,0 +1,61 @@
+# core/layout.py
+import config
+
+# Scenes are laid out against this reference screen. Positions and sizes
+# are written in reference pixels and scaled to the real window:
+#   sx()/sy() scale along one axis (positions, widths that should stretch)
+#   px() scales uniformly (font sizes, margins, line widths)
+REFERENCE_WIDTH = 1024
+REFERENCE_HEIGHT = 768
+
+# Current size of the surface scenes draw on (set by SceneManager.resize)
+width = config.SCREEN_WIDTH
+height = config.SCREEN_HEIGHT
+
+def set_size(new_width, new_height):
+    """Returns True if the size actually changed."""
+    global width, height
+    if (new_width, new_height) == (width, height):
+        return False
+    width, height = new_width, new_height
+    return True
+
+def sx(reference_x):
+    return round(reference_x * width / REFERENCE_WIDTH)
+
+def sy(reference_y):
+    return round(reference_y * height / REFERENCE_HEIGHT)
+
+def scale():
+    return min(width / REFERENCE_WIDTH, height / REFERENCE_HEIGHT)
+
+def px(reference_pixels):
+    return max(1, round(reference_pixels * scale()))
+
+class Viewport:
+    """
+    A part of the screen laid out like a screen of its own, e.g. one
+    player's half in split-screen. sx()/sy()/px() scale reference pixels to
+    the viewport's size; positions still need the viewport's x/y added.
+    """
+    def __init__(self, x, y, view_width, view_height):
+        self.x = x
+        self.y = y
+        self.width = view_width
+        self.height = view_height
+
+    def sx(self, reference_x):
+        return round(reference_x * self.width / REFERENCE_WIDTH)
+
+    def sy(self, reference_y):
+        return round(reference_y * self.height / REFERENCE_HEIGHT)
+
+    def scale(self):
+        return min(self.width / REFERENCE_WIDTH, self.height / REFERENCE_HEIGHT)
+
+    def px(self, reference_pixels):
+        return max(1, round(reference_pixels * self.scale()))
+
+def screen():
+    """The whole window as a Viewport."""
+    return Viewport(0, 0, width, height)
@@ -0,0 +1,243 @@
+# core/midi_input.py
+import collections
+import threading
+import time
+import mido
+import config
+from core import event_log
+from core import timing
+
+log = event_log.get('midi')
+
+# One received MIDI message plus the moment it arrived (core.timing.now())
+# and the name of the port it came from (None for generated events)
+MidiEvent = collections.namedtuple('MidiEvent', ['message', 'timestamp', 'source'], defaults=(None,))
+
+class MidiInput:
+    """
+    Wraps an input port. Messages are received on the backend's own reader
+    thread (mido callback), stamped on arrival and pushed into a bounded
+    ring buffer. The frame loop drains it with poll().
+
+    Several inputs can share one queue (see MidiDeviceManager). virtual=True
+    creates a port other programs can send to (rtmidi backend only).
+    on_event, if given, is also called with every event, on the reader thread.
+    """
+    def __init__(self, port_name, queue_size=None, queue=None, virtual=False, on_event=None):
+        self.name = port_name
+        self.on_event = on_event
+        # deque.append / deque.popleft are atomic in CPython, so the reader
+        # thread and the frame loop never need to take a lock.
+        # With maxlen set, a full queue drops the OLDEST message.
+        if queue is None:
+            queue = collections.deque(maxlen=queue_size or config.MIDI_QUEUE_SIZE)
+        self.queue = queue
+        self.dropped = 0
+        self.last_depth = 0  # Queue depth at the last poll() (for profiling)
+        self.held_notes = set()  # (channel, note) currently down on this device
+        self.pedal_channels = set()  # Channels with the sustain pedal down
+        self.port = mido.open_input(port_name, virtual=virtual, callback=self._on_message)
+
+    def _on_message(self, msg):
+        # Runs on the MIDI thread: take the timestamp before anything else
+        timestamp = timing.now()
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self._push(MidiEvent(msg, timestamp, self.name))
+
+        # Remember what is down, so unplugging can release it
+        if msg.type == 'note_on' and msg.velocity > 0:
+            self.held_notes.add((msg.channel, msg.note))
+        elif msg.type == 'note_off' or msg.type == 'note_on':
+            self.held_notes.discard((msg.channel, msg.note))
+        elif msg.type == 'control_change' and msg.control == 64:
+            if msg.value >= 64:
+                self.pedal_channels.add(msg.channel)
+            else:
+                self.pedal_channels.discard(msg.channel)
+
+    def _push(self, event):
+        self.queue.append(event)
+        if self.on_event:
+            self.on_event(event)
+
+    def release_all(self):
+        """Queues note_off / pedal-up for everything still down (device went away)."""
+        timestamp = timing.now()
+        for channel, note in list(self.held_notes):
+            self._push(MidiEvent(mido.Message('note_off', channel=channel, note=note),
+                                 timestamp, self.name))
+        for channel in list(self.pedal_channels):
+            self._push(MidiEvent(mido.Message('control_change', channel=channel,
+                                              control=64, value=0), timestamp, self.name))
+        self.held_notes.clear()
+        self.pedal_channels.clear()
+
+    def poll(self):
+        """Returns every event received since the last call, oldest first."""
+        events = []
+        queue = self.queue
+        self.last_depth = len(queue)
+        while queue:
+            events.append(queue.popleft())
+        return events
+
+    def close(self):
+        self.port.close()
+
+class MidiDeviceManager:
+    """
+    Keeps every matching input port open at once (e.g. a keyboard plus a
+    pedal controller) and merges them into one time-ordered stream.
+
+    All ports push into a single shared ring buffer; poll() drains it and
+    orders the batch by arrival timestamp. A background thread re-reads
+    the port list every `scan_interval` seconds: new ports are opened,
+    vanished ones are closed and their held notes released, so unplugging
+    and re-plugging a keyboard mid-session just works. The frame loop only
+    ever touches the queue.
+
+    Listeners (add_listener) get each event as soon as it arrives, on the
+    reader thread, for work that shouldn't wait for the next frame
+    (e.g. starting a synth voice). They must be quick and thread-safe.
+    """
+    def __init__(self, device_name=None, ignore=None, scan_interval=None, queue_size=None):
+        # Only ports whose name contains device_name (None = all)
+        self.device_name = device_name if device_name is not None else config.MIDI_DEVICE_NAME
+        self.ignore = tuple(ignore if ignore is not None else config.MIDI_IGNORE_PORTS)
+        self.scan_interval = scan_interval or config.MIDI_SCAN_INTERVAL
+        self.queue = collections.deque(maxlen=queue_size or config.MIDI_QUEUE_SIZE)
+        self.inputs = {}  # Port name -> MidiInput (written by the scan thread)
+        self.lock = threading.Lock()
+        self.last_depth = 0
+        self.scan_error = None
+        # Ports that failed to open aren't retried (or logged) again until
+        # the port list changes, e.g. when something is plugged in
+        self.failed = set()
+        self.seen_names = set()
+        # True until the first scan finishes (opening the backend and
+        # probing ports can take a while; the menu says "connecting")
+        self.connecting = True
+        self.stop_event = threading.Event()
+        self.thread = None
+        # Replaced, never changed in place, so reader threads can iterate it unlocked
+        self.listeners = ()
+
+    def add_listener(self, listener):
+        """Calls listener(event) for every event, on the MIDI reader thread."""
+        self.listeners += (listener,)
+
+    def remove_listener(self, listener):
+        # == rather than "is": a bound method is a new object every time
+        self.listeners = tuple(known for known in self.listeners if known != listener)
+
+    def _dispatch(self, event):
+        for listener in self.listeners:
+            listener(event)
+
+    def wants(self, name):
+        if any(pattern in name for pattern in self.ignore):
+            return False
+        return self.device_name is None or self.device_name in name
+
+    def scan(self):
+        """Opens new ports and closes vanished ones. Returns the open port names."""
+        try:
+            names = set(mido.get_input_names())
+        except Exception as e:
+            # Logged once, not on every scan while the backend stays broken
+            if str(e) != self.scan_error:
+                self.scan_error = str(e)
+                log.error('scan_failed', error=str(e))
+            return self.port_names()
+        self.scan_error = None
+        if names != self.seen_names:
+            self.seen_names = names
+            self.failed.clear()
+
+        with self.lock:
+            current = set(self.inputs)
+        for name in current - names:
+            self.remove_port(name)
+            log.info('disconnected', port=name)
+        for name in sorted(names - current - self.failed):
+            if self.wants(name):
+                try:
+                    self.add_port(name)
+                    log.info('connected', port=name)
+                except Exception as e:
+                    self.failed.add(name)
+                    log.error('open_failed', port=name, error=str(e))
+        return self.port_names()
+
+    def add_port(self, name, virtual=False):
+        midi_input = MidiInput(name, queue=self.queue, virtual=virtual, on_event=self._dispatch)
+        with self.lock:
+            self.inputs[name] = midi_input
+        return midi_input
+
+    def remove_port(self, name):
+        with self.lock:
+            midi_input = self.inputs.pop(name, None)
+        if midi_input:
+            midi_input.release_all()
+            try:
+                midi_input.close()
+            except Exception:
+                pass  # The device is already gone
+
+    def port_names(self):
+        with self.lock:
+            return sorted(self.inputs)
+
+    @property
+    def dropped(self):
+        with self.lock:
+            return sum(midi_input.dropped for midi_input in self.inputs.values())
+
+    def start(self):
+        """
+        Returns right away: the first scan runs on the background thread,
+        which then keeps watching for hot-plugged devices.
+        """
+        self.thread = threading.Thread(target=self._scan_loop, name="midi-hotplug", daemon=True)
+        self.thread.start()
+        return self
+
+    def _scan_loop(self):
+        started = time.perf_counter()
+        names = self.scan()
+        self.connecting = False
+        log.info('discovery_done', ms=round((time.perf_counter() - started) * 1000, 1), ports=names)
+        while not self.stop_event.wait(self.scan_interval):
+            self.scan()
+
+    def status_text(self):
+        """One line for the UI: connecting / device names / nothing found."""
+        if self.connecting:
+            return "MIDI: connecting..."
+        names = self.port_names()
+        if not names:
+            return "MIDI: no keyboard found (mouse works too)"
+        return "MIDI: " + ", ".join(names)
+
+    def poll(self):
+        """Returns every event from every device since the last call, oldest first."""
+        events = []
+        queue = self.queue
+        self.last_depth = len(queue)
+        while queue:
+            events.append(queue.popleft())
+        # Each device's events arrive in order, but two reader threads can
+        # stamp and append in either order. Batches are tiny and nearly
+        # sorted, which Timsort handles in one pass.
+        if len(events) > 1:
+            events.sort(key=lambda event: event.timestamp)
+        return events
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        for name in self.port_names():
+            self.remove_port(name)
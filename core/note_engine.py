@@ -0,0 +1,130 @@
+# core/note_engine.py
+import collections
+import pygame
+
+NOTE_HEIGHT = 40  # px on the reference screen (NoteEngine.note_height is the scaled value)
+
+class FallingNote:
+    # Notes are pooled and reused, so keep them small and fixed-shape
+    __slots__ = ('midi_num', 'hit_time', 'duration', 'min_height', 'rect', 'color_class', 'hit', 'resolved')
+
+    def __init__(self):
+        self.rect = pygame.Rect(0, -NOTE_HEIGHT, 0, NOTE_HEIGHT)
+        self.midi_num = 0
+        self.hit_time = 0.0
+
+    def reset(self, midi_num, lane_x, lane_width, hit_time, height=NOTE_HEIGHT, duration=0.0):
+        self.midi_num = midi_num
+        self.hit_time = hit_time # Song time (seconds) when the note reaches the hit line
+        self.duration = duration # Held notes are drawn as bars this long (in seconds)
+        self.min_height = height
+        self.rect.update(lane_x, -height, lane_width, height)
+        self.color_class = midi_num % 12  # Sprite colour (see core/note_renderer.py)
+        self.hit = False
+        self.resolved = False  # Hit or missed: no longer playable or drawn
+
+    def update(self, song_time, hit_line_y, speed):
+        # Position is a pure function of time: the bottom edge touches the
+        # hit line exactly at hit_time, whatever the frame rate was.
+        self.rect.height = max(self.min_height, int(self.duration * speed))
+        self.rect.bottom = int(hit_line_y - (self.hit_time - song_time) * speed)
+
+class NoteEngine:
+    """
+    Keeps the live falling notes in two time-ordered views:
+      - timeline: every live note, oldest hit_time first (drawing, misses)
+      - lanes[midi]: the notes of one pitch, oldest first (hit judgement)
+    so a key press only looks at the head of its own lane.
+    Notes must be spawned in non-decreasing hit_time order.
+    Finished notes go back to a pool instead of being thrown away.
+    Drawing is done by core.note_renderer.NoteRenderer.
+    """
+    def __init__(self):
+        self.timeline = collections.deque()
+        self.lanes = [collections.deque() for _ in range(128)]
+        self.pool = []
+        self.live_count = 0      # Notes that can still be hit
+        self.missed_notes = []   # (midi, hit_time) filled by update(), reused every frame
+        self.note_height = NOTE_HEIGHT
+
+    def spawn(self, midi_num, lane_x, lane_width, hit_time, duration=0.0):
+        note = self.pool.pop() if self.pool else FallingNote()
+        note.reset(midi_num, lane_x, lane_width, hit_time, self.note_height, duration)
+        self.timeline.append(note)
+        self.lanes[midi_num].append(note)
+        self.live_count += 1
+        return note
+
+    def judge(self, midi_num, press_time, window):
+        """
+        Returns the note of this pitch closest to press_time within
+        +/- window (and marks it hit), or None.
+        """
+        best = None
+        best_error = window
+        for note in self.lanes[midi_num]:
+            if note.resolved:
+                continue
+            error = note.hit_time - press_time
+            if error > window:
+                break  # Lane is sorted: everything after is even later
+            if abs(error) <= best_error:
+                best, best_error = note, abs(error)
+
+        if best:
+            best.hit = True
+            best.resolved = True
+            self.live_count -= 1
+        return best
+
+    def update(self, song_time, window, hit_line_y, speed):
+        """
+        Moves live notes, resolves notes whose hit window has passed as
+        misses, and recycles finished notes. Returns the list of
+        (midi number, hit time) missed this frame (reused between calls).
+        """
+        missed = self.missed_notes
+        missed.clear()
+
+        # 1. Retire notes from the front of the timeline (oldest first)
+        timeline = self.timeline
+        while timeline:
+            note = timeline[0]
+            if not note.resolved:
+                if song_time <= note.hit_time + window:
+                    break
+                note.resolved = True
+                self.live_count -= 1
+                missed.append((note.midi_num, note.hit_time))
+            # The oldest note overall is also the oldest in its lane
+            timeline.popleft()
+            self.lanes[note.midi_num].popleft()
+            self.pool.append(note)
+
+        # 2. Move what's left
+        for note in timeline:
+            if not note.resolved:
+                note.update(song_time, hit_line_y, speed)
+        return missed
+
+    def relayout(self, lane_rect, note_height):
+        """
+        Moves live notes to new lanes after a resize. lane_rect(midi) gives
+        the key rect of a pitch; the vertical position follows on the next
+        update() since it is computed from time.
+        """
+        self.note_height = note_height
+        for note in self.timeline:
+            key_rect = lane_rect(note.midi_num)
+            note.rect.x = key_rect.x
+            note.rect.width = key_rect.width
+            note.min_height = note_height
+            note.rect.height = max(note.rect.height, note_height)
+
+    def clear(self):
+        """Recycles every note (e.g. when restarting the scene)."""
+        while self.timeline:
+            note = self.timeline.popleft()
+            self.lanes[note.midi_num].popleft()
+            self.pool.append(note)
+        self.live_count = 0
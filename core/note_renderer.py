@@ -0,0 +1,127 @@
+# core/note_renderer.py
+import pygame
+import config
+
+# One colour per pitch class (C, C#, D, ... B), so a note's colour says
+# which key it is. These are the "colour classes" baked into the atlas.
+NOTE_COLORS = [
+    (230, 80, 80), (230, 130, 70), (230, 190, 60), (180, 220, 60),
+    (90, 210, 90), (60, 200, 160), (60, 190, 220), (70, 140, 230),
+    (110, 100, 230), (160, 90, 220), (210, 80, 200), (230, 80, 140),
+]
+COLOR_BORDER = (255, 255, 255)
+BORDER = 2
+COLOR_LANE_LINE = (45, 45, 45)
+COLOR_HIT_LINE = (200, 200, 200)
+
+def _clipped(batch, atlas, x, y, area, top, bottom):
+    """Queues a blit of `area` at (x, y), cut to the rows between top and bottom."""
+    area_x, area_y, width, height = area
+    if y < top:
+        area_y += top - y
+        height -= top - y
+        y = top
+    if y + height > bottom:
+        height = bottom - y
+    if height > 0:
+        batch.append((atlas, (x, y), (area_x, area_y, width, height)))
+
+class NoteAtlas:
+    """
+    Every note sprite, baked once into a single surface. One column per
+    (colour class, lane width); each column holds:
+      - a short sprite: the default note, border all round
+      - a tall sprite: `max_length` px of body with side and bottom borders.
+        A long note blits just the bottom part it needs, plus the top border
+        row of the short sprite as a cap, so any length costs two blits.
+    """
+    def __init__(self, widths, note_height, max_length):
+        self.note_height = note_height
+        self.max_length = max(max_length, note_height)
+        self.widths = sorted(set(widths))
+        column_height = note_height + self.max_length
+        atlas_width = sum(self.widths) * len(NOTE_COLORS)
+        self.surface = pygame.Surface((max(1, atlas_width), column_height)).convert()
+
+        self.short_areas = {}  # (colour class, width) -> Rect in the atlas
+        self.tall_areas = {}
+        x = 0
+        for color_class, color in enumerate(NOTE_COLORS):
+            for width in self.widths:
+                short = pygame.Rect(x, 0, width, note_height)
+                tall = pygame.Rect(x, note_height, width, self.max_length)
+                self.surface.fill(color, short)
+                pygame.draw.rect(self.surface, COLOR_BORDER, short, BORDER)
+                self.surface.fill(COLOR_BORDER, tall)
+                self.surface.fill(color, (tall.x + BORDER, tall.y, width - 2 * BORDER, tall.height - BORDER))
+                self.short_areas[color_class, width] = short
+                self.tall_areas[color_class, width] = tall
+                x += width
+
+class NoteRenderer:
+    """
+    Draws a NoteEngine's falling notes for one piano/play-area layout:
+    a cached static layer (background, lane lines, hit line), then every
+    note as a blit from the atlas, queued for the scene's Surface.blits() call.
+
+    Split-screen players each have a renderer (their own play area and
+    layer) but can share one atlas, and queue() lets all of them add to
+    the same blits() batch. Notes are clipped to the play area by hand
+    rather than with set_clip(), so one batch can span several viewports.
+    """
+    def __init__(self, piano, play_rect, note_height, atlas=None):
+        self.play_rect = pygame.Rect(play_rect)
+        if atlas is None:
+            widths = [rect.width for rect in piano.key_rects if rect is not None]
+            # Longest bar worth baking: the whole play area
+            atlas = NoteAtlas(widths, note_height, self.play_rect.height + note_height)
+        self.atlas = atlas
+        self.layer = self._bake_layer(piano)
+
+    def _bake_layer(self, piano):
+        layer = pygame.Surface(self.play_rect.size).convert()
+        layer.fill(config.COLOR_BG)
+        # A faint line between white keys, down to the hit line
+        for key in piano.white_keys:
+            x = key['rect'].x - self.play_rect.x
+            pygame.draw.line(layer, COLOR_LANE_LINE, (x, 0), (x, self.play_rect.height))
+        pygame.draw.line(layer, COLOR_HIT_LINE, (0, self.play_rect.height - 2),
+                         (self.play_rect.width, self.play_rect.height - 2), 2)
+        return layer
+
+    def queue(self, engine, batch):
+        """Appends the static layer and every live note to a blits() batch."""
+        batch.append((self.layer, self.play_rect))
+
+        atlas = self.atlas.surface
+        short_areas = self.atlas.short_areas
+        tall_areas = self.atlas.tall_areas
+        note_height = self.atlas.note_height
+        top = self.play_rect.top
+        bottom = self.play_rect.bottom
+        for note in engine.timeline:
+            if note.resolved:
+                continue
+            rect = note.rect
+            key = (note.color_class, rect.width)
+            short = short_areas.get(key)
+            if short is None:
+                continue  # Lane width from before a resize; fixed by relayout
+            if rect.height <= note_height:
+                if rect.y >= top and rect.y + note_height <= bottom:
+                    batch.append((atlas, rect.topleft, short))
+                else:
+                    _clipped(batch, atlas, rect.x, rect.y, short, top, bottom)
+            else:
+                # Long note: bottom of the tall sprite, capped with a top border
+                tall = tall_areas[key]
+                length = min(rect.height, tall.height)
+                y = rect.bottom - length
+                body = (tall.x, tall.bottom - length, tall.width, length)
+                cap = (short.x, short.y, short.width, BORDER)
+                if y >= top and rect.bottom <= bottom:
+                    batch.append((atlas, (rect.x, y), body))
+                    batch.append((atlas, (rect.x, y), cap))
+                else:
+                    _clipped(batch, atlas, rect.x, y, body, top, bottom)
+                    _clipped(batch, atlas, rect.x, y, cap, top, bottom)
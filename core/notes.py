@@ -0,0 +1,8 @@
+# core/notes.py
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+def midi_to_name(midi_num):
+    """60 -> 'C4'"""
+    idx = midi_num % 12
+    octave = (midi_num // 12) - 1
+    return f"{NOTE_NAMES[idx]}{octave}"
@@ -0,0 +1,71 @@
+# core/perf_overlay.py
+import pygame
+import config
+from core import resources
+from core import text_cache
+from core.profiler import STAGES
+
+GRAPH_MAX_MS = 50.0  # Top of the frame-time graph
+COLOR_OVERLAY_BG = (0, 0, 0)
+COLOR_GRAPH = (100, 200, 255)
+COLOR_BUDGET = (200, 50, 50)   # Line at the target frame time
+
+class PerfOverlay:
+    """Frame-time graph + stage breakdown, drawn on top of the active scene (F3)."""
+    def __init__(self, profiler, width=320, height=230):
+        self.profiler = profiler
+        self.font = resources.get_font("monospace", 14)
+        self.rect = pygame.Rect(0, 10, width, height)
+        self.graph_rect = pygame.Rect(0, self.rect.y + 8, width - 16, 80)
+        self.visible = False
+        self.line_surfaces = []
+        self.frames_until_refresh = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        return self.visible
+
+    def _refresh_text(self, midi_depth, note_count):
+        p = self.profiler
+        frame_ms = p.average(p.frame_times) * 1000
+        fps = 1000 / frame_ms if frame_ms else 0
+        lines = [f"frame {frame_ms:6.2f} ms  ({fps:5.1f} fps)"]
+        for stage in STAGES:
+            lines.append(f"{stage:<13}{p.average(p.stage_times[stage]) * 1000:7.3f} ms")
+        stats = text_cache.get_cache().stats()
+        lines.append(f"midi queue {midi_depth:<4} notes {note_count}")
+        lines.append(f"text cache {stats['hit_rate'] * 100:5.1f}% hit")
+        # Rendered here (not through text_cache) since these change constantly
+        self.line_surfaces = [self.font.render(line, False, config.COLOR_TEXT) for line in lines]
+
+    def draw(self, screen, midi_depth=0, note_count=0):
+        """Draws the overlay and returns its rect (for display.update)."""
+        # Text is re-rendered a few times per second, not every frame
+        if self.frames_until_refresh <= 0:
+            self._refresh_text(midi_depth, note_count)
+            self.frames_until_refresh = 15
+        self.frames_until_refresh -= 1
+
+        # Pinned to the top-right corner, wherever that is after a resize
+        self.rect.right = screen.get_width() - 10
+        self.graph_rect.x = self.rect.x + 8
+        screen.fill(COLOR_OVERLAY_BG, self.rect)
+
+        # 1. Frame-time graph, newest sample on the right
+        g = self.graph_rect
+        samples = self.profiler.recent(self.profiler.frame_times)[-g.width:]
+        if len(samples) > 1:
+            points = [(g.right - len(samples) + i,
+                       g.bottom - min(ms * 1000, GRAPH_MAX_MS) / GRAPH_MAX_MS * g.height)
+                      for i, ms in enumerate(samples)]
+            pygame.draw.lines(screen, COLOR_GRAPH, False, points)
+        if config.FPS:
+            budget_y = g.bottom - (1000 / config.FPS) / GRAPH_MAX_MS * g.height
+            pygame.draw.line(screen, COLOR_BUDGET, (g.x, budget_y), (g.right, budget_y))
+
+        # 2. Numbers
+        y = g.bottom + 6
+        for surf in self.line_surfaces:
+            screen.blit(surf, (g.x, y))
+            y += 15
+        return self.rect
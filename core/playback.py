@@ -0,0 +1,505 @@
+# core/playback.py
+import bisect
+import collections
+import os
+import sys
+import threading
+import time
+import mido
+import numpy as np
+import config
+from core import event_log
+from core import timing
+from core.midi_input import MidiEvent
+
+log = event_log.get('playback')
+
+# Student notes starting within this many seconds of each other are one chord (wait mode)
+CHORD_WINDOW = 0.03
+# Events this close together (song seconds) go out as one batch. Note ends
+# are onset + float32 duration, so they land a hair before the next onset.
+BATCH_WINDOW = 0.001
+
+class SynthOutput:
+    """Plays through the built-in synth (core/synth.py)."""
+    def __init__(self, synth):
+        self.synth = synth
+        self.name = "built-in synth"
+
+    def send(self, messages):
+        timestamp = timing.now()
+        self.synth.feed([MidiEvent(msg, timestamp) for msg in messages])
+
+    def close(self):
+        pass
+
+class PortOutput:
+    """Sends to a MIDI output port, e.g. the student's own keyboard."""
+    def __init__(self, port_name):
+        self.name = port_name
+        self.port = mido.open_output(port_name)
+
+    def send(self, messages):
+        for msg in messages:
+            self.port.send(msg)
+
+    def close(self):
+        self.port.close()
+
+class NullOutput:
+    """Sends nowhere, so benchmarks and replays still run the scheduler."""
+    name = "null"
+
+    def send(self, messages):
+        pass
+
+    def close(self):
+        pass
+
+def open_output(synth=None, keyboard_ports=()):
+    """
+    Where playback goes (config.PLAYBACK_OUTPUT): None = the built-in synth,
+    "keyboard" = the MIDI out of a connected keyboard (keyboard_ports are the
+    open input port names), "null" = nowhere, anything else = the first
+    output port whose name contains it. Falls back to the synth; None if
+    there is no audio either.
+    """
+    wanted = config.PLAYBACK_OUTPUT
+    if wanted == "null":
+        return NullOutput()
+    if wanted:
+        try:
+            names = mido.get_output_names()
+            if wanted == "keyboard":
+                # A keyboard's output port is normally named like its input
+                matches = [name for name in names if name in keyboard_ports]
+            else:
+                matches = [name for name in names if wanted in name]
+            if matches:
+                output = PortOutput(matches[0])
+                log.info('output', port=output.name)
+                return output
+            log.warning('output_not_found', wanted=wanted)
+        except Exception as e:
+            log.error('output_failed', wanted=wanted, error=str(e))
+    return SynthOutput(synth) if synth else None
+
+def _fit_to_range(notes, start, end):
+    """Moves notes by octaves until they are on a start..end keyboard (like the Rhythm Trainer)."""
+    notes = notes.astype(np.int16)
+    below = notes < start
+    notes[below] += (start - notes[below] + 11) // 12 * 12
+    above = notes > end
+    notes[above] -= (notes[above] - end + 11) // 12 * 12
+    return notes
+
+def _group_chords(notes):
+    """(onset times, frozensets of notes) for a time-sorted chart slice."""
+    times = []
+    chords = []
+    for onset, note in zip(notes['time'].tolist(), notes['note'].tolist()):
+        if times and onset - times[-1] <= CHORD_WINDOW:
+            chords[-1].add(note)
+        else:
+            times.append(onset)
+            chords.append({note})
+    return times, [frozenset(chord) for chord in chords]
+
+class Playback:
+    """
+    Plays a chart (core/chart_loader.py) on its own scheduler thread, so
+    the timing of what is heard never depends on the frame loop:
+
+      - the tempo can be scaled (set_tempo) without changing the pitch,
+      - a range of bars can be looped (set_loop),
+      - in wait mode (set_wait) song time stops at each chord the student
+        plays (the `wait` rows) until those keys are down, then carries on
+        from the moment the last of them was struck.
+
+    `play` and `wait` are boolean masks over the chart's rows. The `play`
+    rows are sent to `output` (None = every row): the accompaniment, or the
+    whole piece as a demonstration. Wait notes are moved by octaves onto
+    the student's keyboard (wait_range), so every chord can be played.
+
+    What the student plays comes in through feed(), called straight from
+    the MIDI reader thread (see MidiDeviceManager.add_listener), so the
+    song resumes without waiting for the next frame.
+
+    The thread asks for real-time priority (see _raise_priority), sleeps
+    until shortly before the next event (OS sleeps can wake up late) and
+    spins for the rest. The margin starts at
+    config.PLAYBACK_SPIN_SECONDS and adapts: a late wake-up widens it
+    (a busy render thread on the same core delays wake-ups), and it shrinks
+    back slowly so as little CPU as possible goes into spinning; it never
+    passes config.PLAYBACK_SPIN_MAX_SECONDS, and the spin hands the GIL
+    back on every turn. While an event is coming up, the interpreter's GIL
+    switch interval is lowered to config.PLAYBACK_SWITCH_INTERVAL, so a
+    busy frame loop can only hold it up that long; while paused or waiting
+    for the student the thread just sleeps with the normal interval, which
+    stop() puts back in any case. How late each event actually went out is
+    recorded (jitter_stats()).
+
+    Song time is seconds into the chart. The frame loop only calls the
+    control methods and song_time(); all sending happens on the thread.
+    """
+    def __init__(self, chart, bars, output, play=None, wait=None, wait_range=None):
+        self.bars = bars.tolist()
+        self.output = output
+
+        # 1. Everything to send, sorted by song time (note_offs before
+        # note_ons at the same time, so repeated notes re-strike). Messages
+        # are built here so the scheduler thread doesn't allocate them.
+        played = chart if play is None else chart[play]
+        times = np.concatenate((played['time'], played['time'] + played['duration']))
+        is_on = np.concatenate((np.ones(len(played), dtype=bool), np.zeros(len(played), dtype=bool)))
+        notes = np.concatenate((played['note'], played['note']))
+        velocities = np.concatenate((played['velocity'], played['velocity']))
+        order = np.lexsort((is_on, times))
+        self.event_times = times[order].tolist()
+        self.event_notes = notes[order].tolist()
+        self.event_messages = [mido.Message('note_on', note=note, velocity=velocity) if on
+                               else mido.Message('note_off', note=note)
+                               for on, note, velocity in zip(is_on[order].tolist(), self.event_notes,
+                                                             velocities[order].tolist())]
+        self.end_time = max(self.event_times[-1] if self.event_times else 0.0, float(chart['time'].max(initial=0.0)))
+
+        # 2. The student's chords, for wait mode
+        waited = chart[:0] if wait is None else chart[wait]
+        if wait_range is not None:
+            waited = waited.copy()
+            waited['note'] = _fit_to_range(waited['note'], *wait_range)
+        self.chord_times, self.chord_notes = _group_chords(waited)
+
+        # 3. Transport state, shared with the frame loop (under self.lock).
+        # Song time is anchor_song + (now - anchor_wall) * tempo while running.
+        self.lock = threading.Lock()
+        self.wake = threading.Event()  # Set by every control change
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.tempo = 1.0
+        self.loop = None  # (start, end) song times, see set_loop()
+        self.loop_bars = None  # ...and the (first, last) bars they came from
+        self.wait = False
+        self.paused = False
+        self.finished = False
+        self.waiting_for = None  # Chord (frozenset) the song is stopped at, or None
+        self.anchor_song = 0.0
+        self.anchor_wall = timing.now()
+        self.cursor = 0        # Next event to send
+        self.chord_cursor = 0  # Next chord to wait for
+        self.armed_at = self.anchor_wall  # Keys pressed before this don't count for the next chord
+        self.held = {}  # Note the student has down -> when it was struck (see feed())
+        self.sounding = set()  # Notes sent on and not off yet (released on pause/loop/stop)
+        self.release_pending = False
+        self.spin = config.PLAYBACK_SPIN_SECONDS  # Current wake-up margin (see _sleep_until)
+        self.switch_interval = sys.getswitchinterval()  # The process's own, put back when idle
+
+        # Lateness of every batch sent (seconds), for jitter_stats()
+        self.lateness = collections.deque(maxlen=config.PLAYBACK_JITTER_SAMPLES)
+
+    # --- Frame-loop side ---------------------------------------------------
+
+    def start(self, song_time=0.0):
+        """Starts (or restarts) playing from song_time."""
+        self.stop()
+        self.stop_event.clear()
+        with self.lock:
+            self._seek(song_time, timing.now())
+            self.paused = False
+            self.finished = False
+        self.thread = threading.Thread(target=self._run, name="playback", daemon=True)
+        self.thread.start()
+        log.info('start', song_time=round(song_time, 3), tempo=self.tempo, output=self.output.name)
+
+    def stop(self):
+        """Stops the thread (releasing every sounding note) and logs the jitter."""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.wake.set()
+        self.thread.join()
+        self.thread = None
+        sys.setswitchinterval(self.switch_interval)
+        stats = self.jitter_stats()
+        if stats:
+            over = stats['max_ms'] > config.PLAYBACK_JITTER_LIMIT_MS
+            (log.warning if over else log.info)('jitter', **stats)
+
+    def song_time(self):
+        with self.lock:
+            return self._song_time(timing.now())
+
+    def set_tempo(self, tempo):
+        """Plays at `tempo` times the written speed (0.5 = half speed)."""
+        with self.lock:
+            now = timing.now()
+            self.anchor_song = self._song_time(now)
+            self.anchor_wall = now
+            self.tempo = tempo
+        self.wake.set()
+
+    def set_loop(self, first_bar, last_bar):
+        """
+        Loops bars first_bar..last_bar (inclusive, 0-based); None clears the
+        loop. Bars past the end count as the last bar; an empty loop (end
+        not after start) is ignored. Returns the bars looped from now on.
+        """
+        with self.lock:
+            if first_bar is None:
+                self.loop = None
+                self.loop_bars = None
+            else:
+                last_bar = min(last_bar, len(self.bars) - 2)
+                first_bar = min(first_bar, len(self.bars) - 2)
+                loop = (self.bars[first_bar], self.bars[last_bar + 1])
+                if last_bar < first_bar or loop[1] <= loop[0]:
+                    log.warning('empty_loop', bars=(first_bar + 1, last_bar + 1))
+                    return self.loop_bars
+                self.loop = loop
+                self.loop_bars = (first_bar, last_bar)
+                # Outside the loop: jump to its start now
+                now = timing.now()
+                if not self.loop[0] <= self._song_time(now) < self.loop[1]:
+                    self._seek(self.loop[0], now)
+                    self.release_pending = True
+        self.wake.set()
+        return self.loop_bars
+
+    def set_wait(self, wait):
+        with self.lock:
+            self.wait = wait
+            if not wait and self.waiting_for is not None:
+                # Let go of the chord the song is stopped at
+                self.waiting_for = None
+                self.chord_cursor += 1
+                self.anchor_wall = timing.now()
+            elif wait:
+                # Only chords from here on
+                self.chord_cursor = bisect.bisect_left(self.chord_times, self._song_time(timing.now()))
+        self.wake.set()
+
+    def set_paused(self, paused):
+        with self.lock:
+            now = timing.now()
+            if paused and not self.paused:
+                self.anchor_song = self._song_time(now)
+                self.release_pending = True
+            elif not paused and self.paused:
+                self.anchor_wall = now
+            self.paused = paused
+        self.wake.set()
+
+    def bar_at(self, song_time):
+        """0-based bar number of a song time (the last bar once the song is over)."""
+        return max(0, min(bisect.bisect_right(self.bars, song_time) - 1, len(self.bars) - 2))
+
+    def feed(self, midi_events):
+        """
+        The student's MIDI (MidiEvents). Safe from any thread; the MIDI
+        reader calls it as messages arrive. Completes the chord the song
+        is waiting for.
+        """
+        resumed = False
+        with self.lock:
+            held = self.held
+            for event in midi_events:
+                msg = event.message
+                if msg.type == 'note_on' and msg.velocity > 0:
+                    held[msg.note] = event.timestamp
+                    resumed |= self._check_chord(event.timestamp)
+                elif msg.type == 'note_off' or msg.type == 'note_on':
+                    held.pop(msg.note, None)
+        if resumed:
+            self.wake.set()
+
+    def jitter_stats(self):
+        """p50 / p99 / max lateness of sent events in ms, or None before anything was sent."""
+        if not self.lateness:
+            return None
+        values = np.array(self.lateness) * 1000
+        return {'p50_ms': round(float(np.percentile(values, 50)), 3),
+                'p99_ms': round(float(np.percentile(values, 99)), 3),
+                'max_ms': round(float(values.max()), 3),
+                'over_limit': int((values > config.PLAYBACK_JITTER_LIMIT_MS).sum()),
+                'samples': len(values)}
+
+    # --- Scheduler-thread side ---------------------------------------------
+
+    def _song_time(self, now):
+        if self.paused or self.waiting_for is not None:
+            return self.anchor_song
+        return self.anchor_song + (now - self.anchor_wall) * self.tempo
+
+    def _wall_time(self, song_time):
+        return self.anchor_wall + (song_time - self.anchor_song) / self.tempo
+
+    def _seek(self, song_time, now):
+        self.anchor_song = song_time
+        self.anchor_wall = now
+        self.cursor = bisect.bisect_left(self.event_times, song_time)
+        self.chord_cursor = bisect.bisect_left(self.chord_times, song_time)
+        self.armed_at = now
+        self.waiting_for = None
+
+    def _next_action(self):
+        """(kind, song time) of the next thing to do; ties go loop, chord, then events."""
+        candidates = []
+        if self.loop:
+            candidates.append((self.loop[1], 0, 'loop'))
+        if self.wait and self.chord_cursor < len(self.chord_times):
+            candidates.append((self.chord_times[self.chord_cursor], 1, 'chord'))
+        if self.cursor < len(self.event_times):
+            candidates.append((self.event_times[self.cursor], 2, 'events'))
+        if not candidates:
+            return 'end', self.end_time
+        song_at, _, kind = min(candidates)
+        return kind, song_at
+
+    def _raise_priority(self):
+        """
+        Best effort: ask the OS to run this thread ahead of the frame loop.
+        Real-time scheduling (SCHED_FIFO) first, as it lets the thread
+        preempt a busy render thread on the same core at once; else a
+        per-thread nice value. Both are Linux only and need permission.
+        Returns what was applied, or None.
+        """
+        tid = threading.get_native_id()
+        if config.PLAYBACK_REALTIME_PRIORITY is not None:
+            try:
+                os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(config.PLAYBACK_REALTIME_PRIORITY))
+                return 'realtime'
+            except (AttributeError, OSError):
+                pass
+        if config.PLAYBACK_NICE is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, config.PLAYBACK_NICE)
+                return 'nice'
+            except (AttributeError, OSError):
+                pass
+        return None
+
+    def _run(self):
+        log.debug('priority', raised=self._raise_priority())
+        try:
+            while not self.stop_event.is_set():
+                self.wake.clear()
+                with self.lock:
+                    if self.release_pending:
+                        self.release_pending = False
+                        self._release_all()
+                    if self.paused:
+                        kind = None
+                    elif self.waiting_for is not None:
+                        kind = None  # feed() wakes us once the chord is down
+                    else:
+                        kind, song_at = self._next_action()
+                        wall_at = self._wall_time(song_at)
+                        if kind == 'events':
+                            # Every event due now, picked now so that only
+                            # the send is left once the time comes
+                            first = self.cursor
+                            last = bisect.bisect_right(self.event_times, song_at + BATCH_WINDOW, first)
+                            messages = self.event_messages[first:last]
+
+                if kind is None:
+                    # Nothing to time: sleep, and don't make the rest of
+                    # the process switch threads faster meanwhile
+                    sys.setswitchinterval(self.switch_interval)
+                    self.wake.wait()
+                    continue
+                sys.setswitchinterval(config.PLAYBACK_SWITCH_INTERVAL)
+                if not self._sleep_until(wall_at):
+                    continue  # A control change came in: plan again
+                elif kind == 'events':
+                    self.lateness.append(timing.now() - wall_at)
+                    self.output.send(messages)
+                    with self.lock:
+                        self._sent(messages, first, last)
+                else:
+                    with self.lock:
+                        # Re-checked: a control change may have just landed
+                        if (self.paused or self.waiting_for is not None
+                                or self._next_action() != (kind, song_at)):
+                            continue
+                        if kind == 'end':
+                            self.finished = True
+                            self.paused = True
+                            self.anchor_song = song_at
+                            self._release_all()
+                            log.info('finished')
+                        elif kind == 'loop':
+                            self._release_all()
+                            self._seek(self.loop[0], wall_at)  # Keeps the beat exact
+                        else:
+                            self._arrive_at_chord(song_at, wall_at)
+        finally:
+            with self.lock:
+                self._release_all()
+            sys.setswitchinterval(self.switch_interval)
+
+    def _sleep_until(self, wall_at):
+        """
+        Sleeps, then spins, until wall_at. Returns False if a control change
+        woke the thread first (the plan has to be redone).
+        """
+        spin = self.spin
+        remaining = wall_at - timing.now()
+        if remaining > spin:
+            if self.wake.wait(remaining - spin):
+                return False
+            # Woke up late? Then wake up earlier from now on; else drift
+            # back down towards the configured margin
+            late = timing.now() - (wall_at - spin)
+            self.spin = min(config.PLAYBACK_SPIN_MAX_SECONDS,
+                            max(config.PLAYBACK_SPIN_SECONDS, spin * 0.98, late * 2))
+        clock = timing.now
+        is_set = self.wake.is_set
+        yield_gil = time.sleep
+        while clock() < wall_at:
+            if is_set():
+                return False
+            yield_gil(0)  # Lets the frame loop and the MIDI reader run meanwhile
+        return True
+
+    def _sent(self, messages, first, last):
+        for msg in messages:
+            if msg.type == 'note_on':
+                self.sounding.add(msg.note)
+            else:
+                self.sounding.discard(msg.note)
+        # Unless a seek/loop moved the cursor while they were going out
+        if self.cursor == first:
+            self.cursor = last
+
+    def _arrive_at_chord(self, song_at, wall_at):
+        # The song stops here until the chord is down (maybe it already is)
+        self.anchor_song = song_at
+        self.anchor_wall = wall_at
+        self.waiting_for = self.chord_notes[self.chord_cursor]
+        self._check_chord(wall_at)
+
+    def _check_chord(self, at):
+        """
+        Resumes the song if every note of the chord it waits for has been
+        struck since the last chord. `at` is when the last key went down
+        (or the song got to the chord, if it was already held). Under self.lock.
+        """
+        chord = self.waiting_for
+        if chord is None:
+            return False
+        held = self.held
+        armed_at = self.armed_at
+        if not all(held.get(note, -1.0) >= armed_at for note in chord):
+            return False
+        # Carry on from the chord, counting from when it was played
+        at = max(at, self.anchor_wall)
+        self.waiting_for = None
+        self.chord_cursor += 1
+        self.anchor_wall = at
+        self.armed_at = at  # Notes shared with the next chord must be played again
+        return True
+
+    def _release_all(self):
+        if self.sounding:
+            self.output.send([mido.Message('note_off', note=note) for note in sorted(self.sounding)])
+            self.sounding.clear()
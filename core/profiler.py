@@ -0,0 +1,90 @@
+# core/profiler.py
+import csv
+import json
+import os
+import time
+from array import array
+import config
+
+# Main-loop stages, in the order main.py runs them
+STAGES = ('input', 'handle_input', 'process_midi', 'update', 'draw', 'flip')
+
+class FrameProfiler:
+    """
+    Records how long each stage of the main loop takes, in fixed-size ring
+    buffers (no allocation per frame). Call begin_frame(), then lap(stage)
+    after each stage, then end_frame() once the frame (incl. clock.tick) is over.
+    """
+    def __init__(self, size=None):
+        self.size = size or config.PROFILER_FRAMES
+        self.index = 0   # Slot the current frame writes to
+        self.count = 0   # Number of completed frames (capped at size)
+        self.stage_times = {stage: array('d', [0.0] * self.size) for stage in STAGES}
+        self.frame_times = array('d', [0.0] * self.size)  # Full frame period
+        self.frame_stamps = array('d', [0.0] * self.size) # When each frame began
+        self.midi_depth = array('l', [0] * self.size)     # Events queued at poll time
+        self.note_count = array('l', [0] * self.size)     # Notes on screen
+        self._frame_start = 0.0
+        self._last = 0.0
+
+    def begin_frame(self):
+        self._frame_start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stage_times[stage][self.index] = now - self._last
+        self._last = now
+
+    def end_frame(self, midi_depth=0, note_count=0):
+        i = self.index
+        self.frame_times[i] = time.perf_counter() - self._frame_start
+        self.frame_stamps[i] = self._frame_start
+        self.midi_depth[i] = midi_depth
+        self.note_count[i] = note_count
+        self.index = (i + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def recent(self, buffer):
+        """Values from a ring buffer, oldest first."""
+        start = (self.index - self.count) % self.size
+        return [buffer[(start + k) % self.size] for k in range(self.count)]
+
+    def average(self, buffer, frames=60):
+        """Mean of the last `frames` values of a ring buffer."""
+        n = min(frames, self.count)
+        if n == 0:
+            return 0.0
+        return sum(buffer[(self.index - 1 - k) % self.size] for k in range(n)) / n
+
+    def rows(self):
+        """One dict per recorded frame, oldest first (times in ms)."""
+        columns = {
+            'frame_start': self.recent(self.frame_stamps),
+            'frame_ms': self.recent(self.frame_times),
+            'midi_depth': self.recent(self.midi_depth),
+            'note_count': self.recent(self.note_count),
+        }
+        for stage in STAGES:
+            columns[stage + '_ms'] = self.recent(self.stage_times[stage])
+        rows = []
+        for k in range(self.count):
+            row = {name: values[k] for name, values in columns.items()}
+            for name in row:
+                if name.endswith('_ms'):
+                    row[name] *= 1000.0
+            rows.append(row)
+        return rows
+
+    def export(self, path):
+        """Writes the trace as CSV or JSON, depending on the file extension."""
+        rows = self.rows()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({'stages': list(STAGES), 'frames': rows}, f)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['frame_ms'])
+                writer.writeheader()
+                writer.writerows(rows)
+        return path
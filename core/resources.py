@@ -0,0 +1,104 @@
+# core/resources.py
+import json
+import os
+import threading
+import pygame
+import config
+from core import layout
+from core.graphics import VirtualPiano
+
+# Fonts and pianos are expensive to build (SysFont scans the system font
+# list, VirtualPiano bakes its key surfaces), so they are built once and
+# shared. The lock lets a background preload and the frame loop use the
+# caches at the same time: whoever asks second just waits for the result.
+_lock = threading.RLock()
+_fonts = {}    # (name, size) -> Font
+_font_paths = None  # name -> resolved file path (None = pygame's default font)
+_pianos = {}   # (start, end, x, y, width, height) -> VirtualPiano
+
+def _font_cache_path():
+    return os.path.join(config.CACHE_DIR, "fonts.json")
+
+def font_path(name):
+    """
+    Resolves a system font name to a file, as SysFont does. The first
+    lookup makes pygame scan every installed font (seconds on a Pi), so
+    results are kept in CACHE_DIR/fonts.json and later runs skip the scan.
+    """
+    global _font_paths
+    with _lock:
+        if _font_paths is None:
+            try:
+                with open(_font_cache_path(), encoding='utf-8') as f:
+                    _font_paths = json.load(f)
+            except (OSError, ValueError):
+                _font_paths = {}
+        if name in _font_paths:
+            path = _font_paths[name]
+            if path is None or os.path.exists(path):
+                return path
+        # Not cached (or the font was uninstalled): ask pygame and remember
+        path = pygame.font.match_font(name)
+        _font_paths[name] = path
+        try:
+            os.makedirs(config.CACHE_DIR, exist_ok=True)
+            tmp_path = _font_cache_path() + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(_font_paths, f)
+            os.replace(tmp_path, _font_cache_path())
+        except OSError:
+            pass  # Just slower next time
+        return path
+
+def get_font(name, size):
+    """Cached equivalent of pygame.font.SysFont(name, size)."""
+    key = (name, size)
+    with _lock:
+        font = _fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(font_path(name), size)
+            _fonts[key] = font
+        return font
+
+def get_piano(start_note, end_note, x, y, width, height):
+    """Cached VirtualPiano for one range + geometry."""
+    key = (start_note, end_note, x, y, width, height)
+    with _lock:
+        piano = _pianos.get(key)
+        if piano is None:
+            piano = VirtualPiano(start_note, end_note, x, y, width, height)
+            _pianos[key] = piano
+        return piano
+
+def get_scaled_font(name, size):
+    """Font for a size given in reference pixels (see core/layout.py)."""
+    return get_font(name, layout.px(size))
+
+def clear_pianos():
+    """Drops pianos built for an old window size."""
+    with _lock:
+        _pianos.clear()
+
+def clear_fonts():
+    """
+    Drops fonts (sizes scale with the window, so a drag-resize would
+    otherwise keep adding sizes). Resolved font paths are kept.
+    """
+    with _lock:
+        _fonts.clear()
+
+def preload(scene_classes, keyboard_range):
+    """Builds the fonts and piano layouts every scene class declares."""
+    for scene_class in scene_classes:
+        for name, size in getattr(scene_class, 'FONTS', []):
+            get_scaled_font(name, size)
+        layout = getattr(scene_class, 'piano_layout', None)
+        if layout:
+            get_piano(**layout(*keyboard_range))
+
+def preload_async(scene_classes, keyboard_range):
+    """Runs preload() on a background thread so the current frame isn't blocked."""
+    thread = threading.Thread(target=preload, args=(scene_classes, keyboard_range),
+                              name="resource-preload", daemon=True)
+    thread.start()
+    return thread
@@ -1,19 +1,97 @@
 # core/scene_manager.py
-from scenes.menu_scene import MenuScene
-from scenes.note_trainer import NoteTrainerScene
-from scenes.rhythm_trainer import RhythmTrainerScene # <-- 1. Import it
+import importlib
+import config
+from core import event_log
+from core import layout
+from core import resources
+from core import text_cache
+from core.keyboard_state import KeyboardState
+from core.split_screen import PlayerRouter
+
+log = event_log.get('scene')
+
+# Scene name -> "module:Class". Modules are imported the first time a
+# scene is needed, so startup only pays for the menu.
+SCENES = {
+    'MENU': 'scenes.menu_scene:MenuScene',
+    'NOTE_TRAINER': 'scenes.note_trainer:NoteTrainerScene',
+    'RHYTHM_TRAINER': 'scenes.rhythm_trainer:RhythmTrainerScene',
+    'CHORD_TRAINER': 'scenes.chord_trainer:ChordTrainerScene',
+    'PLAY_ALONG': 'scenes.play_along:PlayAlongScene',
+}
 
 class SceneManager:
     def __init__(self):
-        self.active_scene = MenuScene(self)
+        # Registry: scene name -> class, filled in as modules are imported.
+        # Instances are created on first use and kept alive; on_enter/on_exit
+        # reset their state instead.
+        self.scene_classes = {}
+        self.scenes = {}
+        self.active_scene = None
+        self.synth = None    # Set by main.py when audio is available
+        self.history = None  # Set by main.py when history is enabled
+        self.midi = None     # Set by main.py (MidiDeviceManager), for status display
+        # Shared by every scene: fed with each frame's MIDI before the
+        # active scene sees it, so scenes only read it
+        self.keyboard = KeyboardState()
+        # Which MIDI port is which player in split-screen (the menu changes the count)
+        self.players = PlayerRouter(self.keyboard, config.PLAYERS)
+        self.switch_to('MENU')
+
+    def scene_class(self, scene_name):
+        """Imports the scene's module on first use (safe from any thread)."""
+        scene_class = self.scene_classes.get(scene_name)
+        if scene_class is None:
+            module_name, class_name = SCENES[scene_name].split(':')
+            scene_class = getattr(importlib.import_module(module_name), class_name)
+            self.scene_classes[scene_name] = scene_class
+        return scene_class
+
+    def feed_midi(self, midi_events):
+        """Updates the keyboard states with this frame's MIDI, before the scene sees it."""
+        self.keyboard.update(midi_events)
+        self.players.update(midi_events)
+
+    def get_scene(self, scene_name):
+        scene = self.scenes.get(scene_name)
+        if scene is None:
+            scene = self.scene_class(scene_name)(self)
+            self.scenes[scene_name] = scene
+        return scene
     
     def switch_to(self, scene_name):
-        if scene_name == 'MENU':
-            self.active_scene = MenuScene(self)
-        elif scene_name == 'NOTE_TRAINER':
-            self.active_scene = NoteTrainerScene(self)
-        elif scene_name == 'RHYTHM_TRAINER': # <-- 2. Add this
-            self.active_scene = RhythmTrainerScene(self)
+        if self.active_scene:
+            self.active_scene.on_exit()
+        scene = self.get_scene(scene_name)
+        log.info('switch', scene=scene_name)
+        scene.full_redraw = True
+        scene.on_enter()
+        self.active_scene = scene
+
+    def resize(self, width, height):
+        """
+        The window changed size. The active scene rebuilds its layout now
+        (once, however many resize events came in this frame); the others
+        rebuild theirs in on_enter().
+        """
+        if not layout.set_size(width, height):
+            return
+        # Pianos, fonts and rendered text for the old size won't be used again
+        resources.clear_pianos()
+        resources.clear_fonts()
+        text_cache.get_cache().clear()
+        self.active_scene.relayout()
+        self.active_scene.full_redraw = True
+        self.preload()
+
+    def preload(self, keyboard_range=None):
+        """Builds fonts + piano layouts for the given (or selected) keyboard in the background."""
+        if keyboard_range is None:
+            keyboard_range = (config.USER_KEYBOARD_CONFIG['range']
+                              if config.USER_KEYBOARD_CONFIG else config.DEFAULT_KEYBOARD_RANGE)
+        # A generator, so the scene modules are imported on the preload thread
+        scene_classes = (self.scene_class(name) for name in SCENES)
+        return resources.preload_async(scene_classes, keyboard_range)
     
     def get_active_scene(self):
-        return self.active_scene
\ No newline at end of file
+        return self.active_scene
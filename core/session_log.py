@@ -0,0 +1,249 @@
+# core/session_log.py
+import ast
+import collections
+import mmap
+import os
+import random
+import struct
+import time
+import mido
+import pygame
+from core import timing
+from core.midi_input import MidiEvent
+
+# File layout (little endian):
+#   header: magic, version, random seed, wall-clock start, chart path length + bytes
+#   records: kind (u8), monotonic timestamp (f64), payload length (u16), payload
+MAGIC = b'OKSESS'
+VERSION = 3
+READABLE_VERSIONS = (1, 2, 3)  # Version 1: MIDI payload is just the message bytes
+                               # Version 2: no RESIZE records
+HEADER = struct.Struct('<6sHQdH')
+RECORD = struct.Struct('<BdH')
+
+FRAME = 0    # Start of a main-loop frame (no payload)
+MIDI = 1     # Port index (u8, see PORT) + raw MIDI bytes
+EVENT = 2    # A pygame event: type (u32) + the int fields listed in EVENT_FIELDS
+HISTORY = 3  # repr() of a history query result, so replays see the same data
+PORT = 4     # Name of the next MIDI port index, written before its first message
+NO_PORT = 255  # Port index of MIDI with no source (e.g. scripted input)
+RESIZE = 5   # New window size (u16 width, u16 height), from this frame on
+SIZE = struct.Struct('<HH')
+
+# Pygame events the scenes react to, and the fields needed to rebuild them
+EVENT_FIELDS = {
+    pygame.QUIT: (),
+    pygame.KEYDOWN: ('key', 'mod', 'scancode'),
+    pygame.KEYUP: ('key', 'mod', 'scancode'),
+    pygame.MOUSEBUTTONDOWN: ('x', 'y', 'button'),
+    pygame.MOUSEBUTTONUP: ('x', 'y', 'button'),
+    pygame.MOUSEMOTION: ('x', 'y', 'buttons'),
+}
+EVENT_TYPE = struct.Struct('<I')
+_event_structs = {etype: struct.Struct('<' + 'i' * len(fields)) for etype, fields in EVENT_FIELDS.items()}
+
+def _encode_event(event):
+    fields = EVENT_FIELDS[event.type]
+    values = []
+    for field in fields:
+        if field == 'x':
+            values.append(event.pos[0])
+        elif field == 'y':
+            values.append(event.pos[1])
+        elif field == 'buttons':
+            values.append(sum(1 << i for i, down in enumerate(event.buttons) if down))
+        else:
+            values.append(getattr(event, field))
+    return EVENT_TYPE.pack(event.type) + _event_structs[event.type].pack(*values)
+
+def _decode_event(payload):
+    etype = EVENT_TYPE.unpack_from(payload)[0]
+    values = _event_structs[etype].unpack_from(payload, EVENT_TYPE.size)
+    attrs = dict(zip(EVENT_FIELDS[etype], values))
+    if 'x' in attrs:
+        attrs['pos'] = (attrs.pop('x'), attrs.pop('y'))
+    if 'buttons' in attrs:
+        mask = attrs['buttons']
+        attrs['buttons'] = tuple(int(bool(mask & (1 << i))) for i in range(3))
+    return pygame.event.Event(etype, attrs)
+
+class SessionRecorder:
+    """
+    Writes everything that drives a session: a marker at the start of each
+    frame, the pygame events and MIDI messages handled in it, and the results
+    of history queries. Timestamps come from core.timing (monotonic).
+
+    The recorder seeds `random` itself and stores the seed, so scenes that
+    pick notes with `random` make the same choices on replay. Writes go
+    through a 64 KiB buffer; a frame with no input costs one 11-byte record.
+    """
+    def __init__(self, path, seed=None, chart_path=None):
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), 'little')
+        self.path = path
+        self.seed = seed
+        random.seed(seed)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ports = {}  # MIDI port name -> index (split-screen players are told apart by port)
+        self.file = open(path, 'wb', buffering=64 * 1024)
+        chart = os.fsencode(chart_path) if chart_path else b''
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, time.time(), len(chart)) + chart)
+
+    def _write(self, kind, timestamp, payload=b''):
+        self.file.write(RECORD.pack(kind, timestamp, len(payload)))
+        if payload:
+            self.file.write(payload)
+
+    def frame(self, timestamp):
+        self._write(FRAME, timestamp)
+
+    def pygame_events(self, events, timestamp):
+        for event in events:
+            if event.type in EVENT_FIELDS:
+                self._write(EVENT, timestamp, _encode_event(event))
+
+    def midi_events(self, midi_events):
+        for event in midi_events:
+            self._write(MIDI, event.timestamp, bytes((self._port_index(event),)) + bytes(event.message.bytes()))
+
+    def _port_index(self, event):
+        if event.source is None:
+            return NO_PORT
+        index = self.ports.get(event.source)
+        if index is None:
+            index = self.ports[event.source] = len(self.ports)
+            self._write(PORT, event.timestamp, event.source.encode('utf-8'))
+        return index
+
+    def resize(self, size, timestamp):
+        """The window is now `size`; before the first frame, the size it opened at."""
+        self._write(RESIZE, timestamp, SIZE.pack(*size))
+
+    def history_result(self, result, timestamp):
+        self._write(HISTORY, timestamp, repr(result).encode('utf-8'))
+
+    def close(self):
+        self.file.close()
+
+class RecordedHistory:
+    """Wraps a HistoryStore and logs what its queries returned."""
+    def __init__(self, history, recorder):
+        self.history = history
+        self.recorder = recorder
+
+    def record(self, *args, **kwargs):
+        self.history.record(*args, **kwargs)
+
+    def note_stats(self, *args, **kwargs):
+        result = self.history.note_stats(*args, **kwargs)
+        self.recorder.history_result(result, timing.now())
+        return result
+
+    def weakest_notes(self, *args, **kwargs):
+        result = self.history.weakest_notes(*args, **kwargs)
+        self.recorder.history_result(result, timing.now())
+        return result
+
+    def close(self):
+        self.history.close()
+
+class ReplayedHistory:
+    """Answers history queries from a log, in recorded order. Writes nothing."""
+    def __init__(self, results):
+        self.results = collections.deque(results)
+
+    def record(self, *args, **kwargs):
+        pass
+
+    def _next(self, empty):
+        return self.results.popleft() if self.results else empty
+
+    def note_stats(self, *args, **kwargs):
+        return self._next({})
+
+    def weakest_notes(self, *args, **kwargs):
+        return self._next([])
+
+    def close(self):
+        pass
+
+class SessionLog:
+    """
+    Reads a recorded session. The file is memory-mapped, so long sessions
+    are parsed in place without loading them into memory first.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, self.seed, self.started_at, chart_len = HEADER.unpack_from(self.data)
+        if magic != MAGIC or self.version not in READABLE_VERSIONS:
+            raise ValueError(f"{path} is not a readable session log (versions {READABLE_VERSIONS})")
+        chart = self.data[HEADER.size:HEADER.size + chart_len]
+        self.chart_path = os.fsdecode(chart) if chart else None
+        self.body_offset = HEADER.size + chart_len
+
+    def records(self):
+        """Yields (kind, timestamp, payload) in file order."""
+        data = self.data
+        offset = self.body_offset
+        end = len(data)
+        while offset + RECORD.size <= end:
+            kind, timestamp, length = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + length > end:
+                break  # Truncated by a crash mid-write
+            yield kind, timestamp, data[offset:offset + length]
+            offset += length
+
+    def history_results(self):
+        return [ast.literal_eval(payload.decode('utf-8'))
+                for kind, _, payload in self.records() if kind == HISTORY]
+
+    def frames(self):
+        """
+        Yields (frame_time, pygame_events, midi_events, size), one per recorded
+        frame. size is the window size if it changed in that frame (or before
+        the first one), else None.
+        """
+        frame_time = None
+        events, midi_events = [], []
+        size = None
+        ports = []  # Index -> MIDI port name
+        for kind, timestamp, payload in self.records():
+            if kind == FRAME:
+                if frame_time is not None:
+                    yield frame_time, events, midi_events, size
+                    size = None
+                frame_time = timestamp
+                events, midi_events = [], []
+            elif kind == RESIZE:
+                size = SIZE.unpack(payload)
+            elif kind == EVENT:
+                events.append(_decode_event(payload))
+            elif kind == MIDI:
+                if self.version == 1:
+                    midi_events.append(MidiEvent(mido.Message.from_bytes(payload), timestamp))
+                    continue
+                index = payload[0]
+                source = ports[index] if index != NO_PORT else None
+                midi_events.append(MidiEvent(mido.Message.from_bytes(payload[1:]), timestamp, source))
+            elif kind == PORT:
+                ports.append(payload.decode('utf-8'))
+        if frame_time is not None:
+            yield frame_time, events, midi_events, size
+
+    def close(self):
+        self.data.close()
+
+def new_log_path(directory):
+    return os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S.oksess"))
+
+def prune_logs(directory, keep):
+    """Deletes all but the newest `keep` session logs in directory."""
+    if not os.path.isdir(directory):
+        return
+    logs = sorted(name for name in os.listdir(directory) if name.endswith('.oksess'))
+    for name in logs[:max(0, len(logs) - keep)]:
+        os.remove(os.path.join(directory, name))
@@ -0,0 +1,83 @@
+# core/split_screen.py
+from core import event_log
+from core import layout
+from core.keyboard_state import KeyboardState
+
+log = event_log.get('midi')
+
+# Group lessons: several students, each on their own MIDI keyboard, play
+# the same exercise side by side on one display.
+PLAYER_COUNTS = (1, 2, 4)
+
+# Colour of each seat's label, so students can find their part of the screen
+SEAT_COLORS = [(100, 200, 255), (255, 170, 70), (120, 220, 120), (220, 120, 220)]
+
+def viewports(count):
+    """
+    One layout.Viewport per player: the whole screen for one player, two
+    full-width rows for two (pianos stay wide), quadrants for four.
+    """
+    if count == 1:
+        return [layout.screen()]
+    columns = 1 if count == 2 else 2
+    rows = (count + columns - 1) // columns
+    views = []
+    for seat in range(count):
+        row, column = divmod(seat, columns)
+        x = layout.width * column // columns
+        y = layout.height * row // rows
+        views.append(layout.Viewport(x, y,
+                                     layout.width * (column + 1) // columns - x,
+                                     layout.height * (row + 1) // rows - y))
+    return views
+
+class PlayerRouter:
+    """
+    Splits the merged MIDI stream (see MidiDeviceManager) into players by
+    the port each message came from (MidiEvent.source). A port takes the
+    next free seat the first time it plays a note, so students join by
+    playing; once every seat is taken, other ports are ignored.
+
+    Each seat has its own KeyboardState. With one player every message is
+    theirs and their keyboard is the SceneManager's shared one.
+    """
+    def __init__(self, shared_keyboard, count=1):
+        self.shared_keyboard = shared_keyboard
+        self.set_count(count)
+
+    def set_count(self, count):
+        """Changes the number of players; every seat is free again."""
+        self.count = count
+        self.seats = {}  # source -> seat index
+        if count == 1:
+            self.keyboards = [self.shared_keyboard]
+        else:
+            self.keyboards = [KeyboardState() for _ in range(count)]
+
+    def seat(self, event):
+        """Seat index of the player who sent this event, or None."""
+        if self.count == 1:
+            return 0
+        seat = self.seats.get(event.source)
+        if seat is None:
+            msg = event.message
+            if msg.type != 'note_on' or msg.velocity == 0 or len(self.seats) >= self.count:
+                return None
+            seat = self.seats[event.source] = len(self.seats)
+            log.info('seat_taken', seat=seat + 1, port=event.source)
+        return seat
+
+    def update(self, midi_events):
+        """Feeds each seat's KeyboardState (the shared one is fed by the SceneManager)."""
+        if self.count == 1:
+            return
+        for event in midi_events:
+            seat = self.seat(event)
+            if seat is not None:
+                self.keyboards[seat].update((event,))
+
+    def port_name(self, seat):
+        for source, taken in self.seats.items():
+            if taken == seat:
+                return source
+        return None
@@ -0,0 +1,23 @@
+# core/startup.py
+import time
+
+# Imported first thing by main.py, so this is (nearly) process start
+_start = time.perf_counter()
+_last = _start
+_stages = []  # (stage, seconds) in the order they finished
+
+def mark(stage):
+    """Ends a startup stage: the time since the previous mark is charged to it."""
+    global _last
+    now = time.perf_counter()
+    _stages.append((stage, now - _last))
+    _last = now
+
+def elapsed():
+    return time.perf_counter() - _start
+
+def report(log):
+    """Logs the breakdown as one 'startup' event and returns {stage: ms}."""
+    stages = {stage: round(seconds * 1000, 1) for stage, seconds in _stages}
+    log.info('startup', total_ms=round(elapsed() * 1000, 1), **stages)
+    return stages
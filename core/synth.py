@@ -0,0 +1,223 @@
+# core/synth.py
+import collections
+import numpy as np
+import pygame
+import config
+from core import event_log
+from core import timing
+
+log = event_log.get('audio')
+
+TABLE_SIZE = 2048        # Samples in one wavetable cycle
+HARMONICS = 8            # Partials mixed into the wavetable
+ATTACK_SAMPLES = 64      # Fade-in length, avoids clicks on note_on
+HOLD_DECAY_SECONDS = 2.5 # Time for a held note to fade by ~60 dB (piano-like)
+RELEASE_SECONDS = 0.25   # Time for a released note to fade by ~60 dB
+SILENCE = 1e-4           # Voices below this level are freed
+MASTER_GAIN = 0.25
+
+def _make_wavetable(size):
+    """One cycle of a soft, piano-ish tone: harmonics with falling amplitude."""
+    phase = np.arange(size) * (2 * np.pi / size)
+    table = np.zeros(size)
+    for n in range(1, HARMONICS + 1):
+        table += np.sin(n * phase) / n ** 1.5
+    return (table / np.abs(table).max()).astype(np.float32)
+
+def _decay_per_sample(seconds, sample_rate):
+    # Multiplier that takes a level from 1.0 to 1e-3 (-60 dB) in `seconds`
+    return 10 ** (-3 / (seconds * sample_rate))
+
+class Synth:
+    """
+    Wavetable software synth. note_on/note_off/sustain go through a
+    lock-free command queue (fed by the MIDI reader and the frame loop);
+    the audio device's own thread (SDL callback) drains it and mixes all
+    voices with NumPy, so frame-loop stalls never starve the audio buffer.
+    """
+    def __init__(self, sample_rate=None, buffer_frames=None, polyphony=None):
+        self.sample_rate = sample_rate or config.AUDIO_SAMPLE_RATE
+        self.buffer_frames = buffer_frames or config.AUDIO_BUFFER_FRAMES
+        self.polyphony = polyphony or config.AUDIO_POLYPHONY
+        self.table = _make_wavetable(TABLE_SIZE)
+        self.commands = collections.deque()  # (kind, note, velocity, timestamp)
+        self.device = None
+
+        # Voice state, one slot per voice (struct of arrays, mixed in one go)
+        p = self.polyphony
+        self.voice_note = np.full(p, -1, dtype=np.int16)  # -1 = free
+        self.voice_phase = np.zeros(p)                    # Position in the table
+        self.voice_step = np.zeros(p)                     # Table samples per output sample
+        self.voice_level = np.zeros(p)                    # Current envelope level
+        self.voice_released = np.zeros(p, dtype=bool)     # Key up (and not sustained)
+        self.voice_held_by_pedal = np.zeros(p, dtype=bool)# Key up while sustain is down
+        self.voice_fresh = np.zeros(p, dtype=bool)        # Needs the attack fade-in
+        self.voice_started = np.zeros(p, dtype=np.int64)  # For stealing the oldest voice
+        self.voice_count = 0
+        self.sustain = False
+
+        # Per-block curves by block length, computed once for the buffer size
+        # (and on first use for any other length render() is asked for)
+        self.curves = {}
+        self._block_curves(self.buffer_frames)
+        self.steps = 440.0 * 2 ** ((np.arange(128) - 69) / 12) * TABLE_SIZE / self.sample_rate
+
+        # Latency measurement (config.AUDIO_LATENCY_PROBE): MIDI arrival ->
+        # first rendered sample, plus the device buffer still to play.
+        self.measure_latency = config.AUDIO_LATENCY_PROBE
+        self.latencies = collections.deque(maxlen=1000)
+
+    # --- Frame-loop side ---------------------------------------------------
+
+    def start(self):
+        """Opens the default output device with a callback. Returns False if unavailable."""
+        try:
+            from pygame._sdl2 import audio
+            import pygame._sdl2 as sdl2
+            # pygame.init() gives the audio device to pygame.mixer; take it back
+            pygame.mixer.quit()
+            sdl2.init_subsystem(sdl2.INIT_AUDIO)
+            names = audio.get_audio_device_names(False)
+            name = config.AUDIO_DEVICE_NAME or (names[0] if names else "")
+            self.device = audio.AudioDevice(
+                devicename=name, iscapture=False,
+                frequency=self.sample_rate, audioformat=audio.AUDIO_F32,
+                numchannels=1, chunksize=self.buffer_frames,
+                allowed_changes=0, callback=self._audio_callback)
+            self.device.pause(0)
+        except Exception as e:
+            log.error('device_failed', error=str(e))
+            self.device = None
+            return False
+        log.info('started', sample_rate=self.sample_rate, buffer_frames=self.buffer_frames,
+                 buffer_ms=round(self.buffer_frames / self.sample_rate * 1000, 1))
+        return True
+
+    def feed(self, midi_events):
+        """Queues note_on/note_off/sustain from a list of MidiEvent."""
+        for event in midi_events:
+            self.feed_event(event)
+
+    def feed_event(self, event):
+        """
+        Queues one MidiEvent. Safe from any thread: main.py registers it
+        with the MidiDeviceManager, so notes reach the audio thread straight
+        from the MIDI reader instead of waiting for the next frame.
+        """
+        msg = event.message
+        if msg.type == 'note_on' and msg.velocity > 0:
+            self.commands.append(('on', msg.note, msg.velocity, event.timestamp))
+        elif msg.type == 'note_off' or msg.type == 'note_on':
+            self.commands.append(('off', msg.note, 0, event.timestamp))
+        elif msg.type == 'control_change' and msg.control == 64:
+            self.commands.append(('sustain', 0, msg.value, event.timestamp))
+
+    def latency_report(self):
+        """p50 / p99 / max latency in ms from the probe, or None."""
+        if not self.latencies:
+            return None
+        values = np.array(self.latencies) * 1000
+        return {'p50': float(np.percentile(values, 50)),
+                'p99': float(np.percentile(values, 99)),
+                'max': float(values.max()),
+                'samples': len(values)}
+
+    def close(self):
+        if self.device:
+            self.device.pause(1)
+            self.device.close()
+            self.device = None
+
+    # --- Audio-thread side -------------------------------------------------
+
+    def _audio_callback(self, device, memory):
+        block = np.asarray(memory).view(np.float32)
+        self._apply_commands()
+        block[:] = self.render(len(block))
+
+    def _apply_commands(self):
+        commands = self.commands
+        while commands:
+            kind, note, velocity, timestamp = commands.popleft()
+            if kind == 'on':
+                self._note_on(note, velocity)
+                if self.measure_latency:
+                    buffered = self.buffer_frames / self.sample_rate
+                    self.latencies.append(timing.now() - timestamp + buffered)
+            elif kind == 'off':
+                playing = self.voice_note == note
+                if self.sustain:
+                    self.voice_held_by_pedal |= playing & ~self.voice_released
+                else:
+                    self.voice_released |= playing
+            else:
+                self.sustain = velocity >= 64
+                if not self.sustain:
+                    # Pedal up: everything it was holding starts releasing
+                    self.voice_released |= self.voice_held_by_pedal
+                    self.voice_held_by_pedal[:] = False
+
+    def _note_on(self, note, velocity):
+        # Re-use the voice already playing this note, else a free one,
+        # else steal: the quietest released voice, or failing that the oldest.
+        same = np.flatnonzero(self.voice_note == note)
+        if len(same):
+            v = same[0]
+        else:
+            free = np.flatnonzero(self.voice_note < 0)
+            if len(free):
+                v = free[0]
+            else:
+                released = np.flatnonzero(self.voice_released)
+                if len(released):
+                    v = released[np.argmin(self.voice_level[released])]
+                else:
+                    v = np.argmin(self.voice_started)
+        self.voice_note[v] = note
+        self.voice_step[v] = self.steps[note]
+        self.voice_level[v] = velocity / 127
+        self.voice_released[v] = False
+        self.voice_held_by_pedal[v] = False
+        self.voice_fresh[v] = True
+        self.voice_count += 1
+        self.voice_started[v] = self.voice_count
+
+    def _block_curves(self, frames):
+        """(ramp, hold decay, release decay, attack) curves for a block of `frames` samples."""
+        curves = self.curves.get(frames)
+        if curves is None:
+            n = np.arange(1, frames + 1)
+            curves = self.curves[frames] = (
+                np.arange(frames, dtype=np.float64),
+                _decay_per_sample(HOLD_DECAY_SECONDS, self.sample_rate) ** n,
+                _decay_per_sample(RELEASE_SECONDS, self.sample_rate) ** n,
+                np.minimum(n / ATTACK_SAMPLES, 1.0))
+        return curves
+
+    def render(self, frames):
+        """Mixes every active voice into one block of `frames` mono samples."""
+        active = np.flatnonzero(self.voice_note >= 0)
+        if len(active) == 0 or frames == 0:
+            return np.zeros(frames, dtype=np.float32)
+        ramp, hold_curve, release_curve, attack_curve = self._block_curves(frames)
+
+        # 1. Oscillators: table lookup for all voices x all samples at once
+        phase = self.voice_phase[active]
+        step = self.voice_step[active]
+        index = (phase[:, None] + step[:, None] * ramp) % TABLE_SIZE
+        samples = self.table[index.astype(np.int32)]
+
+        # 2. Envelopes: hold decay or release decay, attack fade on new voices
+        released = self.voice_released[active][:, None]
+        envelope = self.voice_level[active][:, None] * np.where(
+            released, release_curve, hold_curve)
+        fresh = self.voice_fresh[active][:, None]
+        mixed = (samples * np.where(fresh, envelope * attack_curve, envelope)).sum(axis=0)
+
+        # 3. Advance voice state; free voices that have faded out
+        self.voice_phase[active] = (phase + step * frames) % TABLE_SIZE
+        self.voice_level[active] = envelope[:, -1]
+        self.voice_fresh[active] = False
+        self.voice_note[active[envelope[:, -1] < SILENCE]] = -1
+
+        return np.clip(mixed * MASTER_GAIN, -1.0, 1.0).astype(np.float32)
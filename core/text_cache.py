@@ -0,0 +1,70 @@
+# core/text_cache.py
+import collections
+import config
+
+class TextCache:
+    """
+    LRU cache of rendered text surfaces, keyed by (font, text, colour, antialias).
+    An unchanged label like "Score: 42" costs a dict lookup instead of a
+    re-rasterisation. Total pixel memory is capped at max_bytes.
+    """
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else config.TEXT_CACHE_MAX_BYTES
+        self.entries = collections.OrderedDict()  # key -> (surface, size in bytes)
+        self.bytes_used = 0
+
+        # Statistics (see stats())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, antialias, color):
+        """Same arguments as font.render(), but returns a cached surface when possible."""
+        key = (font, text, tuple(color), antialias)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)  # Mark as most recently used
+            return entry[0]
+
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        size = surf.get_width() * surf.get_height() * surf.get_bytesize()
+        if size > self.max_bytes:
+            return surf  # Too big to ever fit, don't flush the cache for it
+
+        self.entries[key] = (surf, size)
+        self.bytes_used += size
+        # Evict least recently used entries until we're under the cap
+        while self.bytes_used > self.max_bytes:
+            _, (_, old_size) = self.entries.popitem(last=False)
+            self.bytes_used -= old_size
+            self.evictions += 1
+        return surf
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes_used = 0
+
+    def stats(self):
+        """Hit/miss counters and memory use, for sizing TEXT_CACHE_MAX_BYTES."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+            'bytes': self.bytes_used,
+            'max_bytes': self.max_bytes,
+        }
+
+# Shared by every scene
+_cache = TextCache()
+
+def render(font, text, antialias, color):
+    """Renders text through the shared cache (drop-in for font.render)."""
+    return _cache.render(font, text, antialias, color)
+
+def get_cache():
+    return _cache
@@ -0,0 +1,50 @@
+# core/timing.py
+import time
+
+# A single monotonic clock shared by MIDI input and game logic, so that
+# a message timestamp can be compared directly with scene time.
+_clock = time.perf_counter
+
+# When the current frame started. Game logic (scene timers, song time,
+# clicks) reads this instead of now(), so everything in a frame sees one
+# time and a replay, which runs each frame at its recorded start time,
+# sees exactly what the live run saw.
+_frame_time = None
+
+def now():
+    """Returns the current monotonic time in seconds (high resolution)."""
+    return _clock()
+
+def start_frame():
+    """Called by the frame loop at the start of each frame. Returns the frame time."""
+    global _frame_time
+    _frame_time = _clock()
+    return _frame_time
+
+def frame_time():
+    """Start of the current frame (now() before the first frame)."""
+    return _clock() if _frame_time is None else _frame_time
+
+def set_clock(clock):
+    """Replaces the clock (any zero-argument callable returning seconds)."""
+    global _clock, _frame_time
+    _clock = clock
+    _frame_time = None
+
+def use_real_clock():
+    set_clock(time.perf_counter)
+
+class VirtualClock:
+    """A clock that only moves when told to, for headless/unthrottled runs."""
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def __call__(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += seconds
+
+    def set(self, time):
+        """Jumps to an absolute time (replays follow recorded frame times)."""
+        self.time = time
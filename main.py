@@ -1,62 +1,220 @@
 # main.py
+from core import startup  # First, so the startup report includes the imports below
+import os
+import time
 import pygame
-import mido
 import sys
+import config
 from config import *
 from core.scene_manager import SceneManager
+from core.midi_input import MidiDeviceManager
+from core.profiler import FrameProfiler
+from core.perf_overlay import PerfOverlay
+from core import event_log, layout, session_log, timing
 
-def get_midi_input():
-    try:
-        names = mido.get_input_names()
-        for name in names:
-            if "Midi Through" not in name:
-                print(f"Connected to MIDI: {name}")
-                return mido.open_input(name)
-    except Exception as e:
-        print(f"MIDI Error: {e}")
-    return None
+log = event_log.get('app')
+startup.mark('imports')
+
+def export_trace(profiler):
+    """F4: dumps the profiler's ring buffers as CSV + JSON for offline analysis."""
+    base = os.path.join(PROFILER_TRACE_DIR, time.strftime("trace-%Y%m%d-%H%M%S"))
+    for path in (base + ".csv", base + ".json"):
+        log.info('trace_written', path=profiler.export(path))
+
+def open_window(fullscreen):
+    """
+    Native mode: a resizable window; scenes re-layout to its size.
+    Scaled mode (RENDER_RESOLUTION, or VSYNC which needs a renderer):
+    scenes draw at a fixed size and SDL stretches it to the window on the
+    GPU, so resizing costs nothing.
+    """
+    flags = pygame.RESIZABLE
+    if fullscreen:
+        flags |= pygame.FULLSCREEN
+    if RENDER_RESOLUTION or VSYNC:
+        size = RENDER_RESOLUTION or (SCREEN_WIDTH, SCREEN_HEIGHT)
+        return pygame.display.set_mode(size, flags | pygame.SCALED, vsync=1 if VSYNC else 0)
+    # (0, 0) = the desktop's resolution
+    return pygame.display.set_mode((0, 0) if fullscreen else (SCREEN_WIDTH, SCREEN_HEIGHT), flags)
+
+def start_audio(midi_in):
+    """
+    Software synth: renders on the audio device's thread. Keyboard notes
+    are queued for it on the MIDI reader thread as they arrive, not once
+    per frame, so a note waits at most one audio buffer. Imported here:
+    it pulls in numpy and opens the audio device, neither of which the
+    first frame needs.
+    """
+    if not AUDIO_ENABLED:
+        return None
+    from core.synth import Synth
+    synth = Synth()
+    if not synth.start():
+        return None
+    midi_in.add_listener(synth.feed_event)
+    return synth
+
+def open_history(recorder):
+    """Practice history, written to disk in batches on a background thread."""
+    if not HISTORY_ENABLED:
+        return None
+    from core.history import HistoryStore
+    history = HistoryStore()
+    if recorder:
+        # Replays must see the same history the scenes saw
+        history = session_log.RecordedHistory(history, recorder)
+    return history
 
 def main():
-    pygame.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    # Optional: python main.py song.mid  -> Rhythm Trainer plays that piece
+    if len(sys.argv) > 1:
+        config.RHYTHM_CHART_PATH = sys.argv[1]
+
+    # Logging is written by a background thread from here on
+    event_log.start()
+    # Only what the first frame needs; the synth opens audio itself
+    pygame.display.init()
+    pygame.font.init()
+    fullscreen = FULLSCREEN
+    screen = open_window(fullscreen)
     pygame.display.set_caption("OpenKeys")
     clock = pygame.time.Clock()
+    startup.mark('display')
+
+    # MIDI is read on background threads and timestamped on arrival; every
+    # connected device is merged into one stream, and plugging/unplugging is
+    # picked up while running. Ports are probed on that thread too, so the
+    # menu shows up straight away with a "connecting" status.
+    midi_in = MidiDeviceManager().start()
+
+    # Record the session (input + frame times + random seed) for replay.py.
+    # Created before the scenes so it seeds `random` before anything uses it.
+    recorder = None
+    if SESSION_RECORDING:
+        session_log.prune_logs(SESSION_LOG_DIR, SESSION_LOG_KEEP - 1)
+        recorder = session_log.SessionRecorder(session_log.new_log_path(SESSION_LOG_DIR),
+                                               chart_path=config.RHYTHM_CHART_PATH)
+        log.info('recording', path=recorder.path)
+    startup.mark('session_log')
 
-    # Initialize Systems
+    # Initialize Systems. Only the menu is imported and built here; the
+    # other scenes are imported and preloaded in the background once a
+    # keyboard is chosen (MenuScene.set_keyboard)
     scene_manager = SceneManager()
-    midi_in = get_midi_input()
+    scene_manager.midi = midi_in
+    # The window may not be the configured size (fullscreen, scaled mode)
+    scene_manager.resize(*screen.get_size())
+    if recorder:
+        recorder.resize(screen.get_size(), timing.now())
+    startup.mark('menu')
 
+    # Audio and the practice history start once the menu is on screen (the
+    # menu needs neither, and no other scene can be entered before that)
+    synth = None
+    history = None
+
+    # Per-stage frame timings (F3 shows them, F4 exports them)
+    profiler = FrameProfiler()
+    overlay = PerfOverlay(profiler)
+
+    first_frame = True
     running = True
     while running:
+        profiler.begin_frame()
+        frame_time = timing.start_frame()
+
         # 1. Collect Inputs
         pygame_events = pygame.event.get()
-        midi_messages = []
         
-        # Get Pygame Quit Event
+        # Get Pygame Quit Event + global debug keys
         for event in pygame_events:
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                if not overlay.toggle():
+                    # Repaint what the overlay was covering
+                    scene_manager.get_active_scene().full_redraw = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                export_trace(profiler)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F11:
+                fullscreen = not fullscreen
+                screen = open_window(fullscreen)
+                scene_manager.get_active_scene().full_redraw = True
+
+        # A drag-resize sends many events; the layout is rebuilt once per
+        # frame at most, from the surface's final size
+        resized = None
+        if screen.get_size() != (layout.width, layout.height):
+            resized = screen.get_size()
+            scene_manager.resize(*resized)
         
-        # Get MIDI Messages (Non-blocking)
-        if midi_in:
-            for msg in midi_in.iter_pending():
-                midi_messages.append(msg)
+        # Drain timestamped MIDI events (Non-blocking)
+        midi_events = midi_in.poll()
+        scene_manager.feed_midi(midi_events)
+        if recorder:
+            recorder.frame(frame_time)
+            if resized:
+                recorder.resize(resized, frame_time)
+            recorder.pygame_events(pygame_events, frame_time)
+            recorder.midi_events(midi_events)
+        profiler.lap('input')
 
         # 2. Update Active Scene
         current_scene = scene_manager.get_active_scene()
         
         current_scene.handle_input(pygame_events)
-        current_scene.process_midi(midi_messages)
+        profiler.lap('handle_input')
+        # Input may have switched scenes: the old one has had its on_exit()
+        # and must not see the rest of the frame
+        current_scene = scene_manager.get_active_scene()
+        current_scene.process_midi(midi_events)
+        profiler.lap('process_midi')
         current_scene.update()
+        profiler.lap('update')
 
         # 3. Draw Active Scene
-        current_scene.draw(screen)
+        # Scenes return only the rects they touched; None means full repaint
+        dirty_rects = current_scene.draw(screen)
+        midi_depth = midi_in.last_depth
+        if overlay.visible:
+            overlay_rect = overlay.draw(screen, midi_depth, current_scene.note_count())
+            if dirty_rects is not None:
+                dirty_rects.append(overlay_rect)
+        profiler.lap('draw')
         
-        pygame.display.flip()
-        clock.tick(FPS)
+        if dirty_rects is None:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        profiler.lap('flip')
+
+        clock.tick(FPS) # FPS = 0 runs uncapped
+        profiler.end_frame(midi_depth, current_scene.note_count())
+
+        if first_frame:
+            # How long until something was on screen, stage by stage
+            first_frame = False
+            startup.mark('first_frame')
+            synth = scene_manager.synth = start_audio(midi_in)
+            startup.mark('audio')
+            history = scene_manager.history = open_history(recorder)
+            startup.mark('history')
+            startup.report(log)
 
-    if midi_in:
-        midi_in.close()
+    # Leave the scene first so it can record its session, then flush history
+    scene_manager.get_active_scene().on_exit()
+    if history:
+        history.close()
+    if recorder:
+        recorder.close()
+    midi_in.close()
+    if synth:
+        report = synth.latency_report()
+        if report:
+            event_log.get('audio').info('latency_ms', p50=round(report['p50'], 1), p99=round(report['p99'], 1),
+                                        max=round(report['max'], 1), samples=report['samples'])
+        synth.close()
+    event_log.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,95 @@
+"""
+Checks MIDI device handling (core/midi_input.py) end to end, with virtual
+ports standing in for real keyboards: hot-plug, merging two devices into
+one time-ordered stream, reader-thread listeners, and releasing held
+notes when a device is unplugged. Needs the rtmidi backend
+(pip install python-rtmidi); no real device is touched.
+
+    python midi_check.py
+"""
+import sys
+import time
+import mido
+from core.midi_input import MidiDeviceManager
+
+PREFIX = "OpenKeys Check"
+WAIT_SECONDS = 3.0
+
+def wait_for(condition, timeout=WAIT_SECONDS):
+    """Polls condition() until it is true or the timeout passes."""
+    end = time.perf_counter() + timeout
+    while time.perf_counter() < end:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+def drain(manager, count, timeout=WAIT_SECONDS):
+    """Polls the manager until `count` events came in (or the timeout passes)."""
+    events = []
+    end = time.perf_counter() + timeout
+    while len(events) < count and time.perf_counter() < end:
+        events += manager.poll()
+        time.sleep(0.01)
+    return events
+
+def main():
+    results = []
+    def check(label, ok):
+        results.append(ok)
+        print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+    manager = MidiDeviceManager(device_name=PREFIX, ignore=(), scan_interval=0.1).start()
+    heard = []
+    manager.add_listener(heard.append)
+    try:
+        # A virtual output port shows up as an input port for everyone else
+        port_a = mido.open_output(f"{PREFIX} A", virtual=True)
+    except Exception as e:
+        print(f"Virtual ports aren't available ({e}): needs python-rtmidi and ALSA or CoreMIDI")
+        manager.close()
+        return 2
+
+    # 1. Hot-plug: the scan thread opens the new port by itself
+    check("device A connected", wait_for(lambda: len(manager.port_names()) == 1))
+
+    # 2. Messages come through the queue and the listeners, in order
+    heard.clear()
+    port_a.send(mido.Message('note_on', note=60, velocity=100))
+    port_a.send(mido.Message('note_off', note=60))
+    events = drain(manager, 2)
+    check("events from A queued in order",
+          [(e.message.type, e.message.note) for e in events] == [('note_on', 60), ('note_off', 60)])
+    check("listener saw A's events on the reader thread", len(heard) == 2)
+
+    # 3. A second device: both streams merge, ordered by arrival time
+    port_b = mido.open_output(f"{PREFIX} B", virtual=True)
+    check("device B connected", wait_for(lambda: len(manager.port_names()) == 2))
+    for note in range(62, 72, 2):
+        port_a.send(mido.Message('note_on', note=note, velocity=100))
+        port_b.send(mido.Message('note_on', note=note + 1, velocity=100))
+        port_a.send(mido.Message('note_off', note=note))
+        port_b.send(mido.Message('note_off', note=note + 1))
+    events = drain(manager, 20)
+    check("merged stream has every event", len(events) == 20)
+    check("merged stream is time-ordered",
+          all(a.timestamp <= b.timestamp for a, b in zip(events, events[1:])))
+    check("both sources tagged", len({e.source for e in events}) == 2)
+
+    # 4. Unplug A with a key down: the manager releases it
+    port_a.send(mido.Message('note_on', note=72, velocity=100))
+    drain(manager, 1)
+    port_a.close()
+    check("device A disconnected", wait_for(lambda: len(manager.port_names()) == 1))
+    events = drain(manager, 1)
+    check("held note released on unplug",
+          any(e.message.type == 'note_off' and e.message.note == 72 for e in events))
+
+    port_b.close()
+    manager.close()
+    passed = sum(results)
+    print(f"{passed}/{len(results)} checks passed")
+    return 0 if passed == len(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
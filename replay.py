@@ -0,0 +1,62 @@
+"""
+Replays a recorded session (see config.SESSION_RECORDING) headlessly and
+as fast as possible, then prints a digest of the final screen so two
+replays, or two versions of the code, can be compared:
+
+    python replay.py ~/.cache/openkeys/sessions/session-20240101-120000.oksess
+    python replay.py session.oksess --checkpoint 600   # digest every 600 frames
+"""
+import argparse
+import hashlib
+import random
+import time
+import pygame
+import config
+from core import headless, session_log
+from core.scene_manager import SceneManager
+
+def screen_digest(screen):
+    return hashlib.sha1(pygame.image.tobytes(screen, 'RGB')).hexdigest()[:16]
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded OpenKeys session.")
+    parser.add_argument('log', help="session log (.oksess)")
+    parser.add_argument('--realtime', action='store_true', help="replay at recorded speed")
+    parser.add_argument('--checkpoint', type=int, default=0,
+                        help="print a screen digest every N frames (0 = only at the end)")
+    args = parser.parse_args()
+
+    log = session_log.SessionLog(args.log)
+    config.RHYTHM_CHART_PATH = log.chart_path
+    # Play Along runs its scheduler but sends nowhere (there is no synth)
+    config.PLAYBACK_OUTPUT = "null"
+    # Same seed as the recording, set before any scene can draw a number
+    random.seed(log.seed)
+
+    screen = headless.init_headless_display()
+    manager = SceneManager()
+    manager.history = session_log.ReplayedHistory(log.history_results())
+    runner = headless.HeadlessRunner(manager, screen)
+
+    def on_frame(frame, scene, midi_events, stage_times):
+        if args.checkpoint and (frame + 1) % args.checkpoint == 0:
+            print(f"frame {frame + 1:>8}  {screen_digest(runner.screen)}")
+
+    wall_start = time.perf_counter()
+    frames = runner.replay(log, on_frame, realtime=args.realtime)
+    wall = time.perf_counter() - wall_start
+    duration = runner.clock() - next(log.frames())[0] if frames else 0.0
+
+    active = manager.get_active_scene()
+    scene_name = next(name for name, scene in manager.scenes.items() if scene is active)
+    print(f"Replayed {frames} frames ({duration:.1f} s of session) in {wall:.2f} s"
+          f" ({duration / wall if wall else 0:.0f}x real time)")
+    print(f"Final scene: {scene_name}, screen digest {screen_digest(runner.screen)}")
+
+    active.on_exit()
+    runner.close()
+    log.close()
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,107 @@
 # scenes/base_scene.py
+import pygame
+import mido
+import config
+from core import timing
+from core.midi_input import MidiEvent
+
 class BaseScene:
+    # Resources the SceneManager can build ahead of time (see core/resources.py):
+    # FONTS lists (name, size) pairs; a scene with a piano also defines
+    # piano_layout(start, end) -> VirtualPiano keyword arguments.
+    FONTS = []
+
     def __init__(self, manager):
         self.manager = manager  # Reference to the SceneManager to switch scenes
+        # When True, the next draw() must repaint the whole screen
+        self.full_redraw = True
+        self.pointer_note = None  # Note currently held down with the mouse/touch
+        self.pointer_piano = None  # ...and the piano it was pressed on (split-screen)
+
+    def on_enter(self):
+        """Called every time the scene becomes active. Reset per-visit state here."""
+        pass
+
+    def relayout(self):
+        """
+        Builds everything that depends on the window size (fonts, piano,
+        rects) from core.layout. Scenes call it from on_enter(); the
+        SceneManager calls it once more after each resize.
+        """
+        pass
+
+    def on_exit(self):
+        """Called when another scene takes over."""
+        pass
+
+    def keyboard_range(self):
+        """(start, end) MIDI range of the user's keyboard."""
+        if config.USER_KEYBOARD_CONFIG:
+            return config.USER_KEYBOARD_CONFIG['range']
+        # Fallback if config is missing (debugging)
+        return config.DEFAULT_KEYBOARD_RANGE
 
     def handle_input(self, events):
         """Handle keyboard/mouse events (Pygame events)."""
         pass
 
-    def process_midi(self, midi_messages):
-        """Handle incoming MIDI messages (List of mido messages)."""
+    def pointer_to_midi(self, events, piano, keyboard=None):
+        """
+        Turns mouse clicks on the virtual piano into note_on/note_off events,
+        so a scene can feed them to process_midi(). Touch screens work too:
+        SDL reports touches as mouse events by default. `keyboard` is the
+        KeyboardState the clicks show up in (default: the shared one).
+        """
+        midi_events = []
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                note = piano.note_at(*event.pos)
+                if note is not None:
+                    self.pointer_note = note
+                    self.pointer_piano = piano
+                    msg = mido.Message('note_on', note=note, velocity=100)
+                    midi_events.append(MidiEvent(msg, timing.frame_time()))
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                if self.pointer_note is not None and self.pointer_piano is piano:
+                    msg = mido.Message('note_off', note=self.pointer_note)
+                    midi_events.append(MidiEvent(msg, timing.frame_time()))
+                    self.pointer_note = None
+        # Clicked notes should sound and show like played ones
+        if midi_events:
+            (self.manager.keyboard if keyboard is None else keyboard).update(midi_events)
+            if self.manager.synth:
+                self.manager.synth.feed(midi_events)
+        return midi_events
+
+    def process_midi(self, midi_events):
+        """
+        Handle incoming MIDI (List of MidiEvent, oldest first).
+        Each event has .message (mido message) and .timestamp (core.timing.now()
+        at the moment the message arrived, not the frame time).
+        """
         pass
 
+    def record_attempt(self, exercise, note, correct, offset_ms=None, response_ms=None):
+        """
+        Queues one attempt for the practice history (no-op when history is
+        off). The history belongs to config.CURRENT_USER, so split-screen
+        games, where several students play, aren't recorded.
+        """
+        if self.manager.history and self.manager.players.count == 1:
+            self.manager.history.record(exercise, note, correct, offset_ms, response_ms)
+
+    def note_count(self):
+        """Number of notes currently in play (shown by the performance overlay)."""
+        return 0
+
     def update(self):
         """Game logic updates (timers, physics, etc)."""
         pass
 
     def draw(self, screen):
-        """Render everything to the screen."""
-        pass
\ No newline at end of file
+        """
+        Render to the screen.
+        Return a list of rects that changed (passed to pygame.display.update),
+        or None if the whole screen was repainted and should be flipped.
+        """
+        return None
\ No newline at end of file
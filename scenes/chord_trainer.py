@@ -0,0 +1,166 @@
+import pygame
+import random
+import config
+from scenes.base_scene import BaseScene
+from core import text_cache
+from core import resources
+from core import timing
+from core import layout
+from core.chords import ChordTracker, CHORD_TYPES, NOTE_NAMES
+
+# Chord qualities asked for (suffixes from core.chords.CHORD_TYPES)
+PRACTICE_QUALITIES = ['', 'm', 'dim', 'aug', '7', 'maj7', 'm7']
+QUALITY_NAMES = {'': 'major', 'm': 'minor', 'dim': 'diminished', 'aug': 'augmented',
+                 '7': 'dominant 7th', 'maj7': 'major 7th', 'm7': 'minor 7th'}
+
+class ChordTrainerScene(BaseScene):
+    FONTS = [("arial", 80), ("arial", 30)]
+
+    def __init__(self, manager):
+        super().__init__(manager)
+        self.piano = None  # Built for the selected keyboard in relayout()
+        # Sounding pitch-class set, updated in O(1) per MIDI message
+        self.tracker = ChordTracker()
+
+    @staticmethod
+    def piano_layout(start, end):
+        """Same place as the Note Trainer: the bottom of the screen."""
+        piano_height = layout.sy(200)
+        margin = layout.sx(50)
+        return dict(
+            start_note=start,
+            end_note=end,
+            x=margin,
+            y=layout.height - piano_height - layout.sy(50),
+            width=layout.width - 2 * margin,
+            height=piano_height
+        )
+
+    def relayout(self):
+        self.font_large = resources.get_scaled_font("arial", 80)
+        self.font_small = resources.get_scaled_font("arial", 30)
+        self.piano = resources.get_piano(**self.piano_layout(*self.keyboard_range()))
+
+        # Everything above the piano is HUD; repainted only when its text changes
+        self.hud_rect = pygame.Rect(0, 0, layout.width, self.piano.y)
+        self.drawn_hud_state = None
+        if self.target:
+            self._hint_keys()
+
+    def on_enter(self):
+        # 1. Setup Piano Visualizer
+        self.target = None
+        self.relayout()
+
+        # 2. Game State
+        self.score = 0
+        self._new_target()  # self.target = (root pitch class, quality)
+        self.feedback_text = "Play the chord (any inversion)"
+        self.feedback_color = config.COLOR_TEXT
+        self.playing_text = ""
+
+        self.tracker.reset()
+        self.pointer_note = None
+
+    def _new_target(self):
+        """Pick a new random chord, different from the current one."""
+        previous = self.target
+        while self.target == previous:
+            self.target = (random.randint(0, 11), random.choice(PRACTICE_QUALITIES))
+        self._hint_keys()
+        self.prompt_time = timing.frame_time()
+
+    def _hint_keys(self):
+        """Hint every key on the keyboard that belongs to the target chord."""
+        root, quality = self.target
+        intervals = dict(CHORD_TYPES)[quality]
+        pitch_classes = {(root + i) % 12 for i in intervals}
+        self.target_keys = frozenset(n for n in range(self.piano.start_note, self.piano.end_note + 1)
+                                     if n % 12 in pitch_classes)
+
+    def _target_name(self):
+        root, quality = self.target
+        return f"{NOTE_NAMES[root]}{quality}"
+
+    def handle_input(self, events):
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    # Go back to menu
+                    self.manager.switch_to('MENU')
+                    return
+
+        # Clicking/touching the on-screen piano plays notes too
+        pointer_events = self.pointer_to_midi(events, self.piano)
+        if pointer_events:
+            self.process_midi(pointer_events)
+
+    def process_midi(self, midi_events):
+        for event in midi_events:
+            msg = event.message
+            self.tracker.process(msg)
+            # Releasing the sustain pedal changes what sounds too
+            if msg.type not in ('note_on', 'note_off') and not (
+                    msg.type == 'control_change' and msg.control == 64):
+                continue
+
+            # One table lookup per message, however many keys are down
+            match = self.tracker.current()
+            self.playing_text = f"Playing: {match.name}" if match else ""
+
+            # Check Game Logic: any reading counts, so Fm7/Ab isn't lost to Ab6
+            match = next((m for m in self.tracker.readings()
+                          if (m.root, m.quality) == self.target), None)
+            if match:
+                response_ms = (event.timestamp - self.prompt_time) * 1000
+                # One attempt per key that made up the chord, as played
+                for note in self.tracker.sounding_notes():
+                    self.record_attempt('CHORD_TRAINER', note, True, response_ms=response_ms)
+                self.score += 1
+                self.feedback_text = f"Correct! {match.name} ({match.inversion_name})"
+                self.feedback_color = config.COLOR_SUCCESS
+                self._new_target()
+
+    def update(self):
+        pass
+
+    def draw(self, screen):
+        dirty = []
+        hud_state = (self.target, self.feedback_text, self.feedback_color, self.score, self.playing_text)
+
+        full_redraw = self.full_redraw
+        if full_redraw:
+            self.full_redraw = False
+            screen.fill(config.COLOR_BG)
+            self.piano.invalidate()
+            self.drawn_hud_state = None
+
+        # 1. Draw UI Text (only when something in it changed)
+        if hud_state != self.drawn_hud_state:
+            self.drawn_hud_state = hud_state
+            screen.fill(config.COLOR_BG, self.hud_rect)
+            dirty.append(self.hud_rect)
+
+            # Draw "Question"
+            text_surf = text_cache.render(self.font_large, f"Play: {self._target_name()}", True, config.COLOR_ACCENT)
+            text_rect = text_surf.get_rect(center=(layout.width//2, layout.sy(130)))
+            screen.blit(text_surf, text_rect)
+
+            quality_surf = text_cache.render(self.font_small, QUALITY_NAMES[self.target[1]], True, config.COLOR_TEXT)
+            screen.blit(quality_surf, quality_surf.get_rect(center=(layout.width//2, layout.sy(190))))
+
+            # Draw "Feedback" and what is being played right now
+            feedback_surf = text_cache.render(self.font_small, self.feedback_text, True, self.feedback_color)
+            screen.blit(feedback_surf, feedback_surf.get_rect(center=(layout.width//2, layout.sy(240))))
+            if self.playing_text:
+                playing_surf = text_cache.render(self.font_small, self.playing_text, True, config.COLOR_TEXT)
+                screen.blit(playing_surf, playing_surf.get_rect(center=(layout.width//2, layout.sy(290))))
+
+            # Draw Score
+            score_surf = text_cache.render(self.font_small, f"Score: {self.score}", True, config.COLOR_TEXT)
+            screen.blit(score_surf, (layout.sx(20), layout.sy(20)))
+
+        # 2. Draw the Virtual Piano: held keys light up, chord tones are outlined
+        dirty += self.piano.draw(screen, active_notes=self.manager.keyboard, target_note=self.target_keys)
+        # After a full fill the margins changed too: flip the whole screen
+        return None if full_redraw else dirty
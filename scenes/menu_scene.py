@@ -2,16 +2,23 @@
 import pygame
 import config
 from scenes.base_scene import BaseScene
+from core import text_cache
+from core import resources
+from core import layout
+from core import event_log
+from core import split_screen
+
+log = event_log.get('menu')
 
 class MenuScene(BaseScene):
+    FONTS = [("arial", 60), ("arial", 40), ("arial", 24)]
+
     def __init__(self, manager):
         super().__init__(manager)
-        self.font_large = pygame.font.SysFont("arial", 60)
-        self.font_medium = pygame.font.SysFont("arial", 40)
-        self.font_small = pygame.font.SysFont("arial", 24)
         
         # State: 'SELECT_KEYBOARD' or 'MAIN_MENU'
         self.state = 'SELECT_KEYBOARD'
+        self.drawn_state = None  # Page currently on screen
         
         self.keyboard_options = [
             {'label': "61 Keys (Standard Portable)", 'keys': 61, 'range': (36, 96)},
@@ -21,10 +28,22 @@ class MenuScene(BaseScene):
         
         self.main_menu_options = [
             "1. Note Trainer",
-            "2. Rhythm Trainer (Coming Soon)",
-            "3. Chord Practice (Coming Soon)"
+            "2. Rhythm Trainer",
+            "3. Chord Practice",
+            "4. Play Along"
         ]
 
+    def on_enter(self):
+        self.relayout()
+        # Coming back from an exercise starts at keyboard selection again
+        self.state = 'SELECT_KEYBOARD'
+        self.drawn_state = None
+
+    def relayout(self):
+        self.font_large = resources.get_scaled_font("arial", 60)
+        self.font_medium = resources.get_scaled_font("arial", 40)
+        self.font_small = resources.get_scaled_font("arial", 24)
+
     def handle_input(self, events):
         for event in events:
             if event.type == pygame.KEYDOWN:
@@ -41,10 +60,15 @@ class MenuScene(BaseScene):
                 # --- LOGIC FOR MAIN MENU ---
                 elif self.state == 'MAIN_MENU':
                     if event.key == pygame.K_1:
-                        print("Switching to Note Trainer...")
                         self.manager.switch_to('NOTE_TRAINER')
                     elif event.key == pygame.K_2:
                         self.manager.switch_to('RHYTHM_TRAINER')
+                    elif event.key == pygame.K_3:
+                        self.manager.switch_to('CHORD_TRAINER')
+                    elif event.key == pygame.K_4:
+                        self.manager.switch_to('PLAY_ALONG')
+                    elif event.key == pygame.K_p:
+                        self.next_player_count()
                     elif event.key == pygame.K_ESCAPE:
                         # Allow going back to re-select keyboard
                         self.state = 'SELECT_KEYBOARD'
@@ -53,10 +77,19 @@ class MenuScene(BaseScene):
         """Saves the user choice to the global config."""
         selected = self.keyboard_options[index]
         config.USER_KEYBOARD_CONFIG = selected
-        print(f"Config Saved: {config.USER_KEYBOARD_CONFIG}")
+        log.info('keyboard_selected', keys=selected['keys'], range=selected['range'])
         self.state = 'MAIN_MENU'
+        # Build the exercises' pianos for this keyboard while the user reads the menu
+        self.manager.preload(selected['range'])
+
+    def next_player_count(self):
+        """Cycles 1 -> 2 -> 4 players (split-screen); seats are re-assigned."""
+        counts = split_screen.PLAYER_COUNTS
+        count = counts[(counts.index(self.manager.players.count) + 1) % len(counts)]
+        self.manager.players.set_count(count)
+        log.info('players_selected', players=count)
 
-    def process_midi(self, midi_messages):
+    def process_midi(self, midi_events):
         # Optional: Let them select with piano keys?
         pass
 
@@ -64,6 +97,14 @@ class MenuScene(BaseScene):
         pass
 
     def draw(self, screen):
+        # The menu is static: only repaint when the page (or MIDI status) changes
+        midi_status = self.manager.midi.status_text() if self.manager.midi else ""
+        state = (self.state, midi_status, self.manager.players.count)
+        if not self.full_redraw and state == self.drawn_state:
+            return []
+        self.full_redraw = False
+        self.drawn_state = state
+
         screen.fill(config.COLOR_BG)
         
         if self.state == 'SELECT_KEYBOARD':
@@ -71,38 +112,52 @@ class MenuScene(BaseScene):
         else:
             self.draw_main_menu(screen)
 
+        if midi_status:
+            status = text_cache.render(self.font_small, midi_status, True, (150, 150, 150))
+            screen.blit(status, (layout.width - status.get_width() - layout.sx(20),
+                                 layout.height - layout.sy(50)))
+        return None
+
     def draw_keyboard_selection(self, screen):
-        title = self.font_large.render("Welcome to OpenKeys", True, config.COLOR_ACCENT)
-        subtitle = self.font_medium.render("Select your keyboard size:", True, config.COLOR_TEXT)
+        title = text_cache.render(self.font_large, "Welcome to OpenKeys", True, config.COLOR_ACCENT)
+        subtitle = text_cache.render(self.font_medium, "Select your keyboard size:", True, config.COLOR_TEXT)
         
         # Center the title
-        screen.blit(title, (config.SCREEN_WIDTH//2 - title.get_width()//2, 100))
-        screen.blit(subtitle, (config.SCREEN_WIDTH//2 - subtitle.get_width()//2, 180))
+        center_x = layout.width // 2
+        screen.blit(title, (center_x - title.get_width()//2, layout.sy(100)))
+        screen.blit(subtitle, (center_x - subtitle.get_width()//2, layout.sy(180)))
 
-        y = 300
+        y = layout.sy(300)
         for i, option in enumerate(self.keyboard_options):
             text = f"[{i+1}] {option['label']}"
-            render = self.font_medium.render(text, True, config.COLOR_TEXT)
-            screen.blit(render, (config.SCREEN_WIDTH//2 - render.get_width()//2, y))
-            y += 70
+            render = text_cache.render(self.font_medium, text, True, config.COLOR_TEXT)
+            screen.blit(render, (center_x - render.get_width()//2, y))
+            y += layout.sy(70)
 
     def draw_main_menu(self, screen):
         # Show what is currently selected at the top right
         current_cfg = config.USER_KEYBOARD_CONFIG
         status_text = f"Config: {current_cfg['keys']} Keys"
-        status_render = self.font_small.render(status_text, True, (100, 100, 100))
-        screen.blit(status_render, (config.SCREEN_WIDTH - 200, 20))
+        status_render = text_cache.render(self.font_small, status_text, True, (100, 100, 100))
+        screen.blit(status_render, (layout.width - layout.sx(200), layout.sy(20)))
 
         # Main Title
-        title = self.font_large.render("Main Menu", True, config.COLOR_ACCENT)
-        screen.blit(title, (50, 50))
+        left = layout.sx(50)
+        title = text_cache.render(self.font_large, "Main Menu", True, config.COLOR_ACCENT)
+        screen.blit(title, (left, layout.sy(50)))
 
         # Options
-        y = 150
+        y = layout.sy(150)
         for opt in self.main_menu_options:
-            text = self.font_medium.render(opt, True, config.COLOR_TEXT)
-            screen.blit(text, (50, y))
-            y += 60
+            text = text_cache.render(self.font_medium, opt, True, config.COLOR_TEXT)
+            screen.blit(text, (left, y))
+            y += layout.sy(60)
+
+        # Split-screen: every player needs their own MIDI keyboard
+        players = self.manager.players.count
+        players_label = f"[P] Players: {players}" + (" (Note / Rhythm Trainer)" if players > 1 else "")
+        text = text_cache.render(self.font_small, players_label, True, config.COLOR_TEXT)
+        screen.blit(text, (left, y + layout.sy(20)))
             
-        help_text = self.font_small.render("Press number keys to select | ESC to go back", True, (150, 150, 150))
-        screen.blit(help_text, (50, config.SCREEN_HEIGHT - 50))
\ No newline at end of file
+        help_text = text_cache.render(self.font_small, "Press number keys to select | ESC to go back", True, (150, 150, 150))
+        screen.blit(help_text, (left, layout.height - layout.sy(50)))
\ No newline at end of file
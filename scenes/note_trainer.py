@@ -1,53 +1,101 @@
 import pygame
-import random
 import config
 from scenes.base_scene import BaseScene
-from core.graphics import VirtualPiano
+from core import text_cache
+from core import resources
+from core import timing
+from core import layout
+from core import split_screen
+from core.notes import midi_to_name
+from core.adaptive import AdaptiveNoteSelector
+
+class NotePlayer:
+    """
+    One student's side of the game: their target note, score and feedback,
+    and where on the screen they are drawn (one per split-screen seat).
+    """
+    def __init__(self, seat):
+        self.seat = seat
+        self.keyboard = None  # This player's KeyboardState (see PlayerRouter)
 
 class NoteTrainerScene(BaseScene):
+    FONTS = [("arial", 80), ("arial", 30)]
+
     def __init__(self, manager):
         super().__init__(manager)
-        self.font_large = pygame.font.SysFont("arial", 80)
-        self.font_small = pygame.font.SysFont("arial", 30)
-
-        # 1. Setup Piano Visualizer
-        # We get the user's config (e.g., 61 keys)
-        if config.USER_KEYBOARD_CONFIG:
-            start, end = config.USER_KEYBOARD_CONFIG['range']
-        else:
-            # Fallback if config is missing (debugging)
-            start, end = 36, 96 
+        self.players = []  # One NotePlayer per seat, built in on_enter()
+        self.batch = []  # (surface, dest) for the frame's one blits() call
 
-        # Create the piano at the bottom of the screen
-        piano_height = 200
-        self.piano = VirtualPiano(
+    @staticmethod
+    def piano_layout(start, end, view=None):
+        """Where the piano goes for a given range: the bottom of the screen (or viewport)."""
+        view = view or layout.screen()
+        piano_height = view.sy(200)
+        margin = view.sx(50)
+        return dict(
             start_note=start,
             end_note=end,
-            x=50, 
-            y=config.SCREEN_HEIGHT - piano_height - 50,
-            width=config.SCREEN_WIDTH - 100,
+            x=view.x + margin,
+            y=view.y + view.height - piano_height - view.sy(50),
+            width=view.width - 2 * margin,
             height=piano_height
         )
 
-        # 2. Game State
-        self.score = 0
-        self.target_note = self._get_new_note()
-        self.feedback_text = "Find the note!"
-        self.feedback_color = config.COLOR_TEXT
-        
-        # Track currently held keys for visual feedback
-        self.held_keys = set()
+    def relayout(self):
+        for player, view in zip(self.players, split_screen.viewports(len(self.players))):
+            player.view = view
+            player.font_large = resources.get_font("arial", view.px(80))
+            player.font_small = resources.get_font("arial", view.px(30))
+
+            # We get the user's config (e.g., 61 keys); the piano itself is
+            # shared and usually already built by the background preload
+            player.piano = resources.get_piano(**self.piano_layout(*self.keyboard_range(), view))
+
+            # Everything above the piano is HUD; repainted only when its text changes
+            player.hud_rect = pygame.Rect(view.x, view.y, view.width, player.piano.y - view.y)
+            player.drawn_hud_state = None
+
+    def on_enter(self):
+        # 1. One player per seat (chosen in the menu), each with their own keyboard
+        router = self.manager.players
+        self.players = [NotePlayer(seat) for seat in range(router.count)]
+        for player in self.players:
+            player.keyboard = router.keyboards[player.seat]
+
+        # 2. Setup Piano Visualizers
+        self.relayout()
+
+        # 3. Adaptive note choice, primed with this student's history
+        # (history is per student, so only when playing alone)
+        start, end = self.keyboard_range()
+        solo_history = self.manager.history if len(self.players) == 1 else None
+        for player in self.players:
+            player.selector = AdaptiveNoteSelector(start, end)
+            if solo_history:
+                player.selector.load_history(solo_history.note_stats('NOTE_TRAINER'))
+
+            # 4. Game State
+            player.score = 0
+            player.target_note = None
+            player.target_note = self._get_new_note(player)
+            player.prompt_time = timing.frame_time()  # When the current target was shown
+            player.feedback_text = "Find the note!"
+            player.feedback_color = config.COLOR_TEXT
+        self.pointer_note = None
+
+        # Reminder of this student's weakest notes (from the practice history)
+        self.weak_notes_text = ""
+        if solo_history:
+            weakest = solo_history.weakest_notes('NOTE_TRAINER', limit=3)
+            if weakest:
+                self.weak_notes_text = "Practice: " + ", ".join(midi_to_name(n) for n, _, _ in weakest)
 
-    def _get_new_note(self):
-        """Pick a random note within the user's range."""
-        start, end = self.piano.start_note, self.piano.end_note
-        return random.randint(start, end)
+    def _get_new_note(self, player):
+        """Pick the next note within the user's range, favouring weak notes."""
+        return player.selector.next_note(exclude=player.target_note)
 
     def _midi_to_name(self, midi_num):
-        names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-        idx = midi_num % 12
-        octave = (midi_num // 12) - 1
-        return f"{names[idx]}{octave}"
+        return midi_to_name(midi_num)
 
     def handle_input(self, events):
         for event in events:
@@ -55,50 +103,112 @@ class NoteTrainerScene(BaseScene):
                 if event.key == pygame.K_ESCAPE:
                     # Go back to menu
                     self.manager.switch_to('MENU')
+                    return
 
-    def process_midi(self, midi_messages):
-        for msg in midi_messages:
+        # Clicking/touching an on-screen piano plays notes for that player
+        for player in self.players:
+            pointer_events = self.pointer_to_midi(events, player.piano, player.keyboard)
+            if pointer_events:
+                self.process_player_midi(player, pointer_events)
+
+    def process_midi(self, midi_events):
+        # Each message goes to the player whose keyboard sent it
+        seat_of = self.manager.players.seat
+        for event in midi_events:
+            seat = seat_of(event)
+            if seat is not None:
+                self.process_player_midi(self.players[seat], (event,))
+
+    def process_player_midi(self, player, midi_events):
+        for event in midi_events:
+            msg = event.message
             if msg.type == 'note_on' and msg.velocity > 0:
-                self.held_keys.add(msg.note)
-                
                 # Check Game Logic
-                if msg.note == self.target_note:
-                    self.score += 1
-                    self.feedback_text = "Correct!"
-                    self.feedback_color = config.COLOR_SUCCESS
-                    self.target_note = self._get_new_note()
+                # Response time runs from the prompt to the MIDI arrival time
+                response_ms = (event.timestamp - player.prompt_time) * 1000
+                correct = msg.note == player.target_note
+                player.selector.record(player.target_note, correct,
+                                       response_ms / 1000 if correct else None)
+                self.record_attempt('NOTE_TRAINER', player.target_note, correct,
+                                    response_ms=response_ms if correct else None)
+                if correct:
+                    player.score += 1
+                    player.feedback_text = "Correct!"
+                    player.feedback_color = config.COLOR_SUCCESS
+                    player.target_note = self._get_new_note(player)
+                    player.prompt_time = event.timestamp
                 else:
-                    self.feedback_text = f"Wrong! That was {self._midi_to_name(msg.note)}"
-                    self.feedback_color = config.COLOR_FAIL
-            
-            elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                if msg.note in self.held_keys:
-                    self.held_keys.remove(msg.note)
+                    player.feedback_text = f"Wrong! That was {self._midi_to_name(msg.note)}"
+                    player.feedback_color = config.COLOR_FAIL
 
     def update(self):
         pass
 
     def draw(self, screen):
-        screen.fill(config.COLOR_BG)
+        dirty = []
+
+        full_redraw = self.full_redraw
+        if full_redraw:
+            self.full_redraw = False
+            screen.fill(config.COLOR_BG)
+            for player in self.players:
+                player.piano.invalidate()
+                player.drawn_hud_state = None
+
+        # Everything that changed, for every player, goes into one
+        # Surface.blits() call at the end
+        batch = self.batch
+        batch.clear()
+
+        # 1. Draw UI Text (only when something in it changed)
+        for player in self.players:
+            if len(self.players) > 1:
+                port = self.manager.players.port_name(player.seat)
+            else:
+                port = None
+            hud_state = (player.target_note, player.feedback_text, player.feedback_color, player.score, port)
+            if hud_state != player.drawn_hud_state:
+                player.drawn_hud_state = hud_state
+                screen.fill(config.COLOR_BG, player.hud_rect)
+                dirty.append(player.hud_rect)
+                self._queue_hud(player, port, batch)
+
+        # 2. Draw the Virtual Pianos
+        # We pass in each player's keyboard state so it lights up what they play
+        # We pass in target_note so it hints what they SHOULD play
+        # Only keys that changed are repainted
+        for player in self.players:
+            dirty += player.piano.draw(screen, active_notes=player.keyboard,
+                                       target_note=player.target_note, batch=batch)
+
+        screen.blits(batch, doreturn=False)
+        # After a full fill the margins changed too: flip the whole screen
+        return None if full_redraw else dirty
+
+    def _queue_hud(self, player, port, batch):
+        view = player.view
+        center_x = view.x + view.width // 2
+        target_name = self._midi_to_name(player.target_note)
 
-        # 1. Draw UI Text
-        target_name = self._midi_to_name(self.target_note)
-        
         # Draw "Question"
-        text_surf = self.font_large.render(f"Find: {target_name}", True, config.COLOR_ACCENT)
-        text_rect = text_surf.get_rect(center=(config.SCREEN_WIDTH//2, 150))
-        screen.blit(text_surf, text_rect)
+        text_surf = text_cache.render(player.font_large, f"Find: {target_name}", True, config.COLOR_ACCENT)
+        batch.append((text_surf, text_surf.get_rect(center=(center_x, view.y + view.sy(150)))))
 
         # Draw "Feedback"
-        feedback_surf = self.font_small.render(self.feedback_text, True, self.feedback_color)
-        feedback_rect = feedback_surf.get_rect(center=(config.SCREEN_WIDTH//2, 220))
-        screen.blit(feedback_surf, feedback_rect)
-        
+        feedback_surf = text_cache.render(player.font_small, player.feedback_text, True, player.feedback_color)
+        batch.append((feedback_surf, feedback_surf.get_rect(center=(center_x, view.y + view.sy(220)))))
+
         # Draw Score
-        score_surf = self.font_small.render(f"Score: {self.score}", True, config.COLOR_TEXT)
-        screen.blit(score_surf, (20, 20))
+        score_surf = text_cache.render(player.font_small, f"Score: {player.score}", True, config.COLOR_TEXT)
+        batch.append((score_surf, (view.x + view.sx(20), view.y + view.sy(20))))
 
-        # 2. Draw the Virtual Piano
-        # We pass in held_keys so it lights up what we play
-        # We pass in target_note so it hints what we SHOULD play
-        self.piano.draw(screen, active_notes=self.held_keys, target_note=self.target_note)
\ No newline at end of file
+        # Top right: the weakest notes reminder, or in split-screen who plays here
+        if len(self.players) > 1:
+            label = f"Player {player.seat + 1}" + (f": {port}" if port else " - play a note to join")
+            corner_surf = text_cache.render(player.font_small, label, True, split_screen.SEAT_COLORS[player.seat])
+        elif self.weak_notes_text:
+            corner_surf = text_cache.render(player.font_small, self.weak_notes_text, True, config.COLOR_ACCENT)
+        else:
+            return
+        batch.append((corner_surf, (view.x + view.width - corner_surf.get_width() - view.sx(20),
+                                    view.y + view.sy(20))))
@@ -0,0 +1,269 @@
+import bisect
+import pygame
+import numpy as np
+import config
+from scenes.base_scene import BaseScene
+from core import text_cache
+from core import resources
+from core import layout
+from core import event_log
+from core import playback
+from core.chart_loader import load_chart, load_bars, LOAD_ERRORS
+
+log = event_log.get('playback')
+chart_log = event_log.get('chart')
+
+TEMPO_STEP = 0.1
+TEMPO_RANGE = (0.25, 2.0)
+
+class PlayAlongScene(BaseScene):
+    """
+    The loaded piece (config.RHYTHM_CHART_PATH) is played for the student:
+    either the accompaniment while they play the melody, or the whole
+    piece as a demonstration. The melody is the part (track, or channel in
+    a single-track file) with the highest notes; its next chord is hinted
+    on the piano.
+    """
+    FONTS = [("arial", 50), ("arial", 26)]
+
+    def __init__(self, manager):
+        super().__init__(manager)
+        self.piano = None     # Built for the selected keyboard in relayout()
+        self.playback = None  # core.playback.Playback while a piece is loaded
+
+    @staticmethod
+    def piano_layout(start, end):
+        """Same place as the Note Trainer: the bottom of the screen."""
+        piano_height = layout.sy(200)
+        margin = layout.sx(50)
+        return dict(
+            start_note=start,
+            end_note=end,
+            x=margin,
+            y=layout.height - piano_height - layout.sy(50),
+            width=layout.width - 2 * margin,
+            height=piano_height
+        )
+
+    def relayout(self):
+        self.font_large = resources.get_scaled_font("arial", 50)
+        self.font_small = resources.get_scaled_font("arial", 26)
+        self.piano = resources.get_piano(**self.piano_layout(*self.keyboard_range()))
+
+        # Everything above the piano is HUD; repainted only when its text changes
+        self.hud_rect = pygame.Rect(0, 0, layout.width, self.piano.y)
+        self.drawn_hud_state = None
+
+    def on_enter(self):
+        # 1. Setup Piano Visualizer
+        self.relayout()
+
+        # 2. Transport settings, kept when the mode changes
+        self.tempo = 1.0
+        self.wait = False
+        self.demo = False
+        self.loop_bars = None  # (first, last) bar numbers, 0-based
+        self.message = ""
+
+        # 3. The piece and where it is played to
+        self.chart = None
+        if not config.RHYTHM_CHART_PATH:
+            self.message = "No piece loaded (set RHYTHM_CHART_PATH in config.py)"
+            return
+        try:
+            self.chart = load_chart(config.RHYTHM_CHART_PATH)
+            self.bars = load_bars(config.RHYTHM_CHART_PATH)
+        except LOAD_ERRORS as e:
+            chart_log.error('load_failed', path=config.RHYTHM_CHART_PATH, error=str(e))
+            self.message = "Couldn't load the piece (see the log)"
+            self.chart = None
+            return
+        midi = self.manager.midi
+        self.output = playback.open_output(self.manager.synth, midi.port_names() if midi else ())
+        if self.output is None:
+            self.message = "No audio output or MIDI out port to play to"
+            self.chart = None
+            return
+
+        # The melody is the part with the highest mean pitch; the student
+        # plays it, everything else is accompaniment. Parts are tracks, or
+        # channels when everything is in one track (a type 0 file).
+        by_track = len(np.unique(self.chart['track'])) > 1
+        parts = self.chart['track'] if by_track else self.chart['channel']
+        names = np.unique(parts).tolist()
+        pitches = [self.chart['note'][parts == part].mean() for part in names]
+        melody_part = names[int(np.argmax(pitches))] if names else 0
+        self.melody = parts == melody_part  # Row mask
+        log.info('piece', path=config.RHYTHM_CHART_PATH, bars=len(self.bars) - 1,
+                 melody=("track " if by_track else "channel ") + str(melody_part),
+                 output=self.output.name)
+
+        # The student's MIDI goes to the scheduler as it arrives (see
+        # Playback.feed); without a MIDI thread (headless runs) it goes
+        # from process_midi()
+        if self.manager.midi:
+            self.manager.midi.add_listener(self._feed_playback)
+        self._start_playback(0.0)
+
+    def _start_playback(self, song_time):
+        """(Re)builds the Playback for the current mode and starts it at song_time."""
+        if self.playback:
+            self.playback.stop()
+        play = None if self.demo else ~self.melody
+        self.playback = playback.Playback(self.chart, self.bars, self.output, play=play,
+                                          wait=self.melody, wait_range=self.keyboard_range())
+        self.playback.set_tempo(self.tempo)
+        self.playback.set_wait(self.wait and not self.demo)
+        if self.loop_bars:
+            self.playback.set_loop(*self.loop_bars)
+        self.playback.start(song_time)
+
+    def _feed_playback(self, event):
+        """MIDI reader thread: one event for whichever Playback is current."""
+        pb = self.playback
+        if pb:
+            pb.feed((event,))
+
+    def on_exit(self):
+        if self.manager.midi:
+            self.manager.midi.remove_listener(self._feed_playback)
+        if self.playback:
+            self.playback.stop()
+            self.playback = None
+        if self.chart is not None:
+            self.output.close()
+
+    def handle_input(self, events):
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    # Go back to menu
+                    self.manager.switch_to('MENU')
+                    return
+                if self.playback:
+                    self._transport_key(event.key)
+
+        # Clicking/touching the on-screen piano plays notes too (and counts in wait mode)
+        pointer_events = self.pointer_to_midi(events, self.piano)
+        if pointer_events and self.playback:
+            self.playback.feed(pointer_events)
+
+    def process_midi(self, midi_events):
+        # Normally the MIDI thread has already fed these to the scheduler
+        if self.playback and not self.manager.midi:
+            self.playback.feed(midi_events)
+
+    def _transport_key(self, key):
+        pb = self.playback
+        bar = pb.bar_at(pb.song_time())
+        if key == pygame.K_SPACE:
+            if pb.finished:
+                self._start_playback(pb.bars[self.loop_bars[0]] if self.loop_bars else 0.0)
+            else:
+                pb.set_paused(not pb.paused)
+        elif key in (pygame.K_UP, pygame.K_DOWN):
+            step = TEMPO_STEP if key == pygame.K_UP else -TEMPO_STEP
+            self.tempo = round(min(TEMPO_RANGE[1], max(TEMPO_RANGE[0], self.tempo + step)), 2)
+            pb.set_tempo(self.tempo)
+        elif key == pygame.K_w:
+            self.wait = not self.wait
+            pb.set_wait(self.wait and not self.demo)
+        elif key == pygame.K_m:
+            # Accompany <-> demonstrate, from where the song is now
+            self.demo = not self.demo
+            self._start_playback(pb.song_time())
+        elif key == pygame.K_LEFTBRACKET:
+            last = self.loop_bars[1] if self.loop_bars else bar
+            self._set_loop(bar, max(bar, last))
+        elif key == pygame.K_RIGHTBRACKET:
+            first = self.loop_bars[0] if self.loop_bars else 0
+            self._set_loop(min(first, bar), bar)
+        elif key == pygame.K_BACKSPACE:
+            self._set_loop(None, None)
+
+    def _set_loop(self, first, last):
+        # Playback clamps the bars (and ignores an empty loop): keep what it took
+        self.loop_bars = self.playback.set_loop(first, last)
+        log.info('loop', bars=None if self.loop_bars is None else tuple(bar + 1 for bar in self.loop_bars))
+
+    def _upcoming_chord(self, song_time):
+        """The melody chord the student should play next (hinted on the piano)."""
+        pb = self.playback
+        waiting_for = pb.waiting_for  # Read once: the scheduler thread changes it
+        if waiting_for is not None:
+            return waiting_for
+        index = bisect.bisect_left(pb.chord_times, song_time)
+        return pb.chord_notes[index] if index < len(pb.chord_notes) else None
+
+    def update(self):
+        pass
+
+    def draw(self, screen):
+        dirty = []
+
+        full_redraw = self.full_redraw
+        if full_redraw:
+            self.full_redraw = False
+            screen.fill(config.COLOR_BG)
+            self.piano.invalidate()
+            self.drawn_hud_state = None
+
+        pb = self.playback
+        if pb:
+            song_time = pb.song_time()
+            bar = pb.bar_at(song_time)
+            target = self._upcoming_chord(song_time)
+            if pb.finished:
+                status = "Finished - SPACE to play again"
+            elif pb.waiting_for is not None:
+                status = "Waiting for you..."
+            elif pb.paused:
+                status = "Paused"
+            else:
+                status = "Playing"
+            hud_state = (status, bar, self.tempo, self.wait, self.demo, self.loop_bars)
+        else:
+            target = None
+            hud_state = (self.message,)
+
+        # 1. Draw UI Text (only when something in it changed)
+        if hud_state != self.drawn_hud_state:
+            self.drawn_hud_state = hud_state
+            screen.fill(config.COLOR_BG, self.hud_rect)
+            dirty.append(self.hud_rect)
+            if pb:
+                self._draw_hud(screen, status, bar)
+            else:
+                text_surf = text_cache.render(self.font_small, self.message, True, config.COLOR_FAIL)
+                screen.blit(text_surf, text_surf.get_rect(center=(layout.width//2, layout.sy(150))))
+
+        # 2. Draw the Virtual Piano: held keys light up, the next melody chord is outlined
+        dirty += self.piano.draw(screen, active_notes=self.manager.keyboard, target_note=target)
+        # After a full fill the margins changed too: flip the whole screen
+        return None if full_redraw else dirty
+
+    def _draw_hud(self, screen, status, bar):
+        center_x = layout.width // 2
+        mode = "Demonstration" if self.demo else "Accompaniment - you play the melody"
+        title_surf = text_cache.render(self.font_large, mode, True, config.COLOR_ACCENT)
+        screen.blit(title_surf, title_surf.get_rect(center=(center_x, layout.sy(110))))
+
+        status_surf = text_cache.render(self.font_small, status, True, config.COLOR_TEXT)
+        screen.blit(status_surf, status_surf.get_rect(center=(center_x, layout.sy(170))))
+
+        # Transport settings, top left
+        bars = len(self.playback.bars) - 1
+        lines = [f"Bar {bar + 1} / {bars}",
+                 f"Tempo {self.tempo * 100:.0f}%",
+                 "Wait mode: " + ("on" if self.wait and not self.demo else "off")]
+        if self.loop_bars:
+            lines.append(f"Loop: bars {self.loop_bars[0] + 1}-{self.loop_bars[1] + 1}")
+        y = layout.sy(20)
+        for line in lines:
+            surf = text_cache.render(self.font_small, line, True, config.COLOR_TEXT)
+            screen.blit(surf, (layout.sx(20), y))
+            y += layout.sy(32)
+
+        help_text = "SPACE pause | UP/DOWN tempo | W wait | M mode | [ ] loop | BKSP no loop | ESC"
+        help_surf = text_cache.render(self.font_small, help_text, True, (150, 150, 150))
+        screen.blit(help_surf, help_surf.get_rect(center=(center_x, self.piano.y - layout.sy(30))))
@@ -2,158 +2,342 @@ import pygame
 import random
 import config
 from scenes.base_scene import BaseScene
-from core.graphics import VirtualPiano
-
-class FallingNote:
-    def __init__(self, midi_num, lane_x, lane_width, spawn_y, target_y, speed):
-        self.midi_num = midi_num
-        self.rect = pygame.Rect(lane_x, spawn_y, lane_width, 40) # 40px height note
-        self.color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
-        self.target_y = target_y
-        self.speed = speed # Pixels per frame
-        self.active = True
-        self.hit = False
+from core import text_cache
+from core import resources
+from core import timing
+from core import layout
+from core.note_engine import NoteEngine, NOTE_HEIGHT
+from core.note_renderer import NoteRenderer
+from core.chart_loader import load_chart, LOAD_ERRORS
+from core.analytics import TimingAnalytics
+from core.notes import midi_to_name
+from core import event_log
+from core import split_screen
 
-    def update(self):
-        self.rect.y += self.speed
-        
-    def draw(self, screen):
-        # Draw the main note body
-        pygame.draw.rect(screen, self.color, self.rect)
-        # Draw a border
-        pygame.draw.rect(screen, (255, 255, 255), self.rect, 2)
+log = event_log.get('judge')
+session_log = event_log.get('session')
+chart_log = event_log.get('chart')
+
+class RhythmPlayer:
+    """
+    One student's side of the game: their falling notes, score and timing
+    statistics, and where on the screen they are drawn. There is one per
+    split-screen seat; everything else (song clock, chart) is shared.
+    """
+    def __init__(self, seat):
+        self.seat = seat
+        self.notes = NoteEngine() # Pooled falling notes, indexed by pitch (kept between visits)
+        # Every hit/miss of the session, for timing statistics
+        self.analytics = TimingAnalytics()
+        self.keyboard = None  # This player's KeyboardState (see PlayerRouter)
+        self.pixels_per_second = None  # Fall speed in their viewport (set by relayout)
+
+    def reset(self):
+        self.notes.clear()
+        self.score = 0
+        self.misses = 0
+        self.analytics.reset()
+        self.judgement = ""  # Last hit's rating, shown in the HUD
+        self.holds = {}  # midi -> (hit_time, duration) of long notes being held
 
 class RhythmTrainerScene(BaseScene):
+    FONTS = [("arial", 30)]
+
     def __init__(self, manager):
         super().__init__(manager)
-        self.font = pygame.font.SysFont("arial", 30)
-        
-        # 1. Setup Piano (Same as Note Trainer)
-        if config.USER_KEYBOARD_CONFIG:
-            start, end = config.USER_KEYBOARD_CONFIG['range']
-        else:
-            start, end = 36, 96 
+        # One RhythmPlayer per seat, created on first use and kept between visits
+        self.all_players = [RhythmPlayer(0)]
+        self.players = self.all_players[:1]
+        self.batch = []  # (surface, dest[, area]) for the frame's one blits() call
+
+        # Game Settings (all in seconds / pixels per second, never frames)
+        self.scroll_speed = 180     # Pixels per second (reference screen; scaled in relayout)
+        self.lead_time = None       # Seconds a note takes to fall (set by relayout)
+        self.spawn_interval = 2.0   # Spawn a note every 2 seconds
+        self.hit_window = 0.25      # +/- seconds around hit_time that count as a hit
+        self.points = {'PERFECT': 10, 'GOOD': 5, 'OK': 2}
+        # Long chart notes must also be held: up to hold_points more, in
+        # proportion to how much of the note's length the key stayed down
+        self.min_hold = 0.2         # Notes shorter than this are just tapped
+        self.hold_points = 10
 
-        piano_height = 150
-        self.piano_y = config.SCREEN_HEIGHT - piano_height - 20
-        self.piano = VirtualPiano(
+    @staticmethod
+    def piano_layout(start, end, view=None):
+        """Where the piano goes: the bottom of the screen (or of a split-screen viewport)."""
+        view = view or layout.screen()
+        piano_height = view.sy(150)
+        margin = view.sx(50)
+        return dict(
             start_note=start, 
             end_note=end, 
-            x=50, y=self.piano_y, 
-            width=config.SCREEN_WIDTH - 100, 
+            x=view.x + margin, y=view.y + view.height - piano_height - view.sy(20), 
+            width=view.width - 2 * margin, 
             height=piano_height
         )
 
-        # 2. Game Settings
-        self.scroll_speed = 3  # Pixels per frame
-        self.spawn_timer = 0
-        self.spawn_rate = 120  # Spawn a note every 120 frames (approx 2 seconds)
-        
-        self.notes = [] # List of FallingNote objects
-        self.score = 0
-        self.misses = 0
-        self.held_keys = set()
+    def relayout(self):
+        atlases = {}  # (lane widths, note height, play height) -> NoteAtlas
+        for player, view in zip(self.players, split_screen.viewports(len(self.players))):
+            player.view = view
+            player.font = resources.get_font("arial", view.px(30))
 
-    def _spawn_note(self):
-        # 1. Pick a random note in range
-        note_num = random.randint(self.piano.start_note, self.piano.end_note)
-        
-        # 2. Find the X position of that key on the piano
-        # We need to ask the piano where this key is. 
-        # Since VirtualPiano pre-calculates rects, we can look it up!
-        
-        target_key_rect = None
-        # Check white keys
-        for k in self.piano.white_keys:
-            if k['note'] == note_num:
-                target_key_rect = k['rect']
-                break
-        # Check black keys
-        if not target_key_rect:
-            for k in self.piano.black_keys:
-                if k['note'] == note_num:
-                    target_key_rect = k['rect']
-                    break
+            # 1. Setup Piano (Same as Note Trainer)
+            player.piano = resources.get_piano(**self.piano_layout(*self.keyboard_range(), view))
+
+            # Everything above the piano is repainted every frame
+            player.play_rect = pygame.Rect(view.x, view.y, view.width, player.piano.y - view.y)
+
+            note_height = view.sy(NOTE_HEIGHT)
+            # Notes already falling move to the new lanes
+            player.notes.relayout(player.piano.get_key_rect, note_height)
+
+            # Time a note needs to fall from just above the play area to the
+            # hit line. Every player shares it (they get the same hit times)
+            # and it stays put for the whole song, so notes keep being spawned
+            # in hit_time order (see NoteEngine); after a resize, or in a
+            # viewport of another size, the speed changes to match instead.
+            if self.lead_time is None:
+                speed = self.scroll_speed * view.height / layout.REFERENCE_HEIGHT
+                self.lead_time = (player.play_rect.height + note_height) / speed
+            player.pixels_per_second = (player.play_rect.height + note_height) / self.lead_time
+
+            # Lane lines baked for this viewport. Players whose lanes are the
+            # same widths share note sprites (viewports can differ by a pixel
+            # when the window size doesn't split evenly).
+            widths = frozenset(rect.width for rect in player.piano.key_rects if rect is not None)
+            atlas_key = (widths, note_height, player.play_rect.height)
+            player.renderer = NoteRenderer(player.piano, player.play_rect, note_height, atlases.get(atlas_key))
+            atlases[atlas_key] = player.renderer.atlas
+
+    def on_enter(self):
+        # 1. One player per seat (chosen in the menu), each with their own keyboard
+        router = self.manager.players
+        while len(self.all_players) < router.count:
+            self.all_players.append(RhythmPlayer(len(self.all_players)))
+        self.players = self.all_players[:router.count]
+        for player in self.players:
+            player.reset()
+            player.keyboard = router.keyboards[player.seat]
+        self.lead_time = None  # Measured on the first player's viewport
+        self.relayout()
+
+        # 2. Song Clock: song time 0 is when the scene starts
+        self.start_time = timing.frame_time()
+        self.song_time = 0.0
+        self.next_spawn_time = 0.0  # Song time of the next spawn
+
+        # 3. Optional chart (a real piece). Notes are streamed into the
+        # engine through a look-ahead window instead of all at once.
+        self.chart = None
+        self.chart_cursor = 0  # Index of the next chart row to spawn
+        if config.RHYTHM_CHART_PATH:
+            try:
+                self.chart = load_chart(config.RHYTHM_CHART_PATH)
+            except LOAD_ERRORS as e:
+                # Random notes instead of the piece
+                chart_log.error('load_failed', path=config.RHYTHM_CHART_PATH, error=str(e))
         
-        if target_key_rect:
-            new_note = FallingNote(
-                midi_num=note_num,
-                lane_x=target_key_rect.x,
-                lane_width=target_key_rect.width,
-                spawn_y=-50, # Start just above screen
-                target_y=self.piano_y,
-                speed=self.scroll_speed
-            )
-            self.notes.append(new_note)
+        self.pointer_note = None
+
+    def _spawn_random_note(self, spawn_time):
+        # Pick a random note in range
+        start, end = self.keyboard_range()
+        note_num = random.randint(start, end)
+        self._spawn_note(note_num, spawn_time + self.lead_time)
+
+    def _spawn_note(self, note_num, hit_time, duration=0.0):
+        # Every player gets the same notes, each in their own lanes.
+        # VirtualPiano keeps a note-indexed table of rects, so finding the
+        # X position of that key is O(1)
+        for player in self.players:
+            target_key_rect = player.piano.get_key_rect(note_num)
+            if target_key_rect:
+                player.notes.spawn(
+                    midi_num=note_num,
+                    lane_x=target_key_rect.x,
+                    lane_width=target_key_rect.width,
+                    hit_time=hit_time,
+                    duration=duration
+                )
+
+    def _stream_chart(self):
+        """Spawns every chart note that is now within lead_time of the hit line."""
+        times = self.chart['time']
+        # Chart time 0 reaches the hit line lead_time after the scene starts,
+        # so a note enters the screen once song_time passes its chart time.
+        while self.chart_cursor < len(times) and times[self.chart_cursor] <= self.song_time:
+            row = self.chart[self.chart_cursor]
+            self.chart_cursor += 1
+            note_num = self._fit_to_range(int(row['note']))
+            self._spawn_note(note_num, float(row['time']) + self.lead_time, float(row['duration']))
+
+    def _fit_to_range(self, note_num):
+        """Moves a note by octaves until it's on the user's keyboard."""
+        start, end = self.keyboard_range()
+        while note_num < start:
+            note_num += 12
+        while note_num > end:
+            note_num -= 12
+        return note_num
 
     def handle_input(self, events):
         for event in events:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.manager.switch_to('MENU')
+                    return
+
+        # Clicking/touching an on-screen piano plays notes for that player
+        for player in self.players:
+            pointer_events = self.pointer_to_midi(events, player.piano, player.keyboard)
+            if pointer_events:
+                self.process_player_midi(player, pointer_events)
+
+    def process_midi(self, midi_events):
+        # Each message goes to the player whose keyboard sent it
+        seat_of = self.manager.players.seat
+        for event in midi_events:
+            seat = seat_of(event)
+            if seat is not None:
+                self.process_player_midi(self.players[seat], (event,))
 
-    def process_midi(self, midi_messages):
-        for msg in midi_messages:
+    def process_player_midi(self, player, midi_events):
+        for event in midi_events:
+            msg = event.message
             if msg.type == 'note_on' and msg.velocity > 0:
-                self.held_keys.add(msg.note)
-                self.check_hit(msg.note)
+                self.check_hit(player, msg.note, event.timestamp)
             
             elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                if msg.note in self.held_keys:
-                    self.held_keys.remove(msg.note)
+                if msg.note in player.holds:
+                    self.grade_hold(player, msg.note, event.timestamp - self.start_time)
 
-    def check_hit(self, played_note):
-        """Logic to see if the user hit a note at the right time."""
-        hit_zone = 50 # Pixels tolerance (roughly the height of a falling note)
-        
-        for note in self.notes:
-            if note.active and not note.hit and note.midi_num == played_note:
-                # Check distance to the "Hit Line" (piano_y)
-                distance = abs(note.rect.y - self.piano_y)
-                
-                if distance < hit_zone:
-                    note.hit = True
-                    note.active = False # Remove it
-                    self.score += 10
-                    print("Hit!")
-                    return # Only hit the lowest note per key press
+    def check_hit(self, player, played_note, timestamp):
+        """
+        Logic to see if the user hit a note at the right time.
+        timestamp is when the MIDI message actually arrived, so the
+        judgement is done in song time, independent of the frame rate.
+        """
+        press_time = timestamp - self.start_time
+
+        # Only the notes in this key's lane are looked at
+        note = player.notes.judge(played_note, press_time, self.hit_window)
+        if note:
+            offset = press_time - note.hit_time  # Negative = early
+            player.judgement = player.analytics.record_hit(played_note, note.hit_time, offset)
+            player.score += self.points[player.judgement]
+            self.record_attempt('RHYTHM_TRAINER', played_note, True, offset_ms=offset * 1000)
+            log.debug('hit', player=player.seat + 1, note=played_note,
+                      offset_ms=round(offset * 1000, 1), rating=player.judgement)
+            if note.duration >= self.min_hold:
+                player.holds[played_note] = (note.hit_time, note.duration)
+
+    def grade_hold(self, player, note_num, release_time):
+        """Scores a long note once its key is released (or its length is over)."""
+        hit_time, duration = player.holds.pop(note_num)
+        held = min(release_time, hit_time + duration) - hit_time
+        ratio = max(0.0, min(1.0, held / duration))
+        player.score += round(self.hold_points * ratio)
+        player.judgement = f"HOLD {ratio * 100:.0f}%"
+        log.debug('hold', player=player.seat + 1, note=note_num, held=round(ratio, 3))
+
+    def on_exit(self):
+        # End of session: full statistics, computed once in batch
+        for player in self.players:
+            if player.analytics.count:
+                self.log_summary(player.analytics.summary(self.hit_window), player.seat)
+
+    def log_summary(self, stats, seat=0):
+        weakest = sorted(stats['per_note_accuracy'].items(), key=lambda item: item[1])[:3]
+        session_log.info('rhythm_summary', player=seat + 1,
+                         hits=stats['hits'], misses=stats['misses'],
+                         accuracy=round(stats['accuracy'], 3),
+                         mean_offset_ms=round(stats['mean_offset_ms'], 1),
+                         median_offset_ms=round(stats['median_offset_ms'], 1),
+                         spread_ms=round(stats['std_offset_ms'], 1),
+                         early=stats['early'], late=stats['late'],
+                         drift_ms_per_min=round(stats['tempo_drift_ms_per_min'], 1),
+                         weakest=[f"{midi_to_name(note)} ({acc * 100:.0f}%)" for note, acc in weakest])
+
+    def note_count(self):
+        return sum(player.notes.live_count for player in self.players)
 
     def update(self):
-        # 1. Spawner
-        self.spawn_timer += 1
-        if self.spawn_timer >= self.spawn_rate:
-            self._spawn_note()
-            self.spawn_timer = 0
-
-        # 2. Move Notes
-        for note in self.notes:
-            note.update()
-            
-            # Check Miss (Passed the piano)
-            if note.active and note.rect.y > config.SCREEN_HEIGHT:
-                note.active = False
-                self.misses += 1
-                print("Miss!")
+        self.song_time = timing.frame_time() - self.start_time
 
-        # 3. Cleanup inactive notes
-        self.notes = [n for n in self.notes if n.active]
+        # 1. Spawner (catches up with every spawn missed during a hitch)
+        if self.chart is not None:
+            self._stream_chart()
+        else:
+            while self.song_time >= self.next_spawn_time:
+                self._spawn_random_note(self.next_spawn_time)
+                self.next_spawn_time += self.spawn_interval
+
+        for player in self.players:
+            # 2. Long notes still held to the end get full marks. The keyboard
+            # state says whether the key is down (the pedal doesn't count).
+            keyboard = player.keyboard
+            for note_num, (hit_time, duration) in list(player.holds.items()):
+                if self.song_time >= hit_time + duration and note_num in keyboard:
+                    self.grade_hold(player, note_num, self.song_time)
+
+            # 3. Move Notes, and count every note whose hit window has passed
+            missed = player.notes.update(self.song_time, self.hit_window, player.piano.y, player.pixels_per_second)
+            for note_num, hit_time in missed:
+                player.analytics.record_miss(note_num, hit_time)
+                self.record_attempt('RHYTHM_TRAINER', note_num, False)
+                player.misses += 1
+                log.debug('miss', player=player.seat + 1, note=note_num, hit_time=round(hit_time, 3))
 
     def draw(self, screen):
-        screen.fill(config.COLOR_BG)
+        full_redraw = self.full_redraw
+        if full_redraw:
+            self.full_redraw = False
+            screen.fill(config.COLOR_BG)
+            for player in self.players:
+                player.piano.invalidate()
+
+        # The whole frame is one Surface.blits() call, however many players:
+        # each play area changes every frame (notes move), so it is queued
+        # as a whole: cached lane lines, then its notes (clipped so they
+        # never paint over a piano or another viewport), then its HUD.
+        # The pianos add only the keys that changed.
+        batch = self.batch
+        batch.clear()
+        dirty = []
+        for player in self.players:
+            player.renderer.queue(player.notes, batch)
+            self._queue_hud(player, batch)
+            dirty.append(player.play_rect)
+
+        # Draw Pianos (Foreground)
+        # We pass each player's keyboard so keys light up when they play
+        for player in self.players:
+            dirty += player.piano.draw(screen, active_notes=player.keyboard, batch=batch)
 
-        # Draw "Lane Lines" (Optional visuals to make it look cool)
-        # pygame.draw.line(screen, (50, 50, 50), (x, 0), (x, height))
+        screen.blits(batch, doreturn=False)
+        # After a full fill the margins changed too: flip the whole screen
+        return None if full_redraw else dirty
 
-        # Draw Notes
-        for note in self.notes:
-            note.draw(screen)
+    def _queue_hud(self, player, batch):
+        view, font = player.view, player.font
+        left = view.x + view.sx(20)
+        score_text = text_cache.render(font, f"Score: {player.score}", True, config.COLOR_SUCCESS)
+        miss_text = text_cache.render(font, f"Misses: {player.misses}", True, config.COLOR_FAIL)
+        batch.append((score_text, (left, view.y + view.sy(20))))
+        batch.append((miss_text, (left, view.y + view.sy(60))))
 
-        # Draw Piano (Foreground)
-        # We pass active notes so keys light up when you play
-        self.piano.draw(screen, active_notes=self.held_keys)
+        # Live timing: average offset and the last judgement
+        live = player.analytics.live()
+        if live['hits']:
+            mean_ms = round(live['mean_offset_ms'])
+            timing_label = f"{player.judgement}  avg {mean_ms:+d} ms  early {live['early']} / late {live['late']}"
+            timing_text = text_cache.render(font, timing_label, True, config.COLOR_TEXT)
+            batch.append((timing_text, (left, view.y + view.sy(100))))
 
-        # Draw HUD
-        score_text = self.font.render(f"Score: {self.score}", True, config.COLOR_SUCCESS)
-        miss_text = self.font.render(f"Misses: {self.misses}", True, config.COLOR_FAIL)
-        screen.blit(score_text, (20, 20))
-        screen.blit(miss_text, (20, 60))
\ No newline at end of file
+        # Split-screen: who plays here (and how to join while the seat is free)
+        if len(self.players) > 1:
+            port = self.manager.players.port_name(player.seat)
+            label = f"Player {player.seat + 1}" + (f": {port}" if port else " - play a note to join")
+            seat_text = text_cache.render(font, label, True, split_screen.SEAT_COLORS[player.seat])
+            batch.append((seat_text, (view.x + view.width - seat_text.get_width() - view.sx(20),
+                                       view.y + view.sy(20))))